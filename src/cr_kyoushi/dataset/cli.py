@@ -37,8 +37,9 @@ from .parser import LogstashParser
 from .processors import ProcessorPipeline
 from .sample import (
     get_sample,
-    get_sample_log,
+    get_sample_logs,
 )
+from .templates import set_bytecode_cache_dir
 from .utils import (
     load_file,
     write_model_to_yaml,
@@ -107,12 +108,26 @@ class CliPath(click.Path):
     show_default=True,
     help="The connection string for the elasticsearch database",
 )
+@click.option(
+    "--template-cache",
+    type=CliPath(file_okay=False, writable=True, resolve_path=True),
+    default=None,
+    envvar="KYOUSHI_TEMPLATE_CACHE",
+    help="Directory to keep compiled template files in for reuse by later runs",
+)
 @pass_info
-def cli(info: Info, dataset: Path, logstash: Path, elasticsearch: str):
+def cli(
+    info: Info,
+    dataset: Path,
+    logstash: Path,
+    elasticsearch: str,
+    template_cache: Optional[Path],
+):
     """Run Cyber Range Kyoushi Dataset."""
     info.dataset_dir = dataset
     info.logstash_bin = logstash
     info.elasticsearch_url = elasticsearch
+    set_bytecode_cache_dir(template_cache)
     # change to dataset directory
     if info.dataset_dir.exists():
         os.chdir(info.dataset_dir)
@@ -582,15 +597,12 @@ def sample(
             stop=until_timestamp,
         )
 
-        samples = [
-            get_sample_log(
-                es,
-                line,
-                label if label is not None else default_label,
-                info.dataset_dir.joinpath(LAYOUT.GATHER.value),
-                related=_related,
-                index=_index,
-            )
-            for line in lines
-        ]
+        samples = get_sample_logs(
+            es,
+            lines,
+            label if label is not None else default_label,
+            info.dataset_dir.joinpath(LAYOUT.GATHER.value),
+            related=_related,
+            index=_index,
+        )
         print(json.dumps(samples, indent=4))
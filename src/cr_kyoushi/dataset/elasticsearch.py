@@ -8,17 +8,25 @@ from typing import (
     Sequence,
     Union,
 )
+from weakref import WeakKeyDictionary
 
 from elasticsearch import Elasticsearch
 from elasticsearch_dsl import Search
 from elasticsearch_dsl.response.aggs import Bucket
 
 
+_transport_variables_cache: "WeakKeyDictionary[Elasticsearch, Dict[str, Any]]" = (
+    WeakKeyDictionary()
+)
+"""Cache of the connection info extracted from each client object"""
+
+
 def get_transport_variables(es: Elasticsearch) -> Dict[str, Any]:
     """Utility function for getting Elasticsearch connection info.
 
     This function takes an Elasticsearch client object and
     extracts the host connection info and returns it in a dict.
+    The connection info is only extracted once for each client object.
 
     Args:
         es: Elasticsearch client object
@@ -35,6 +43,26 @@ def get_transport_variables(es: Elasticsearch) -> Dict[str, Any]:
           - `ELASTICSEARCH_USER`: The username if HTTP auth is used
           - `ELASTICSEARCH_PASSWORD`: The password if HTTP auth is used
     """
+    host_variables = _transport_variables_cache.get(es)
+    if host_variables is None:
+        host_variables = _get_transport_variables(es)
+        _transport_variables_cache[es] = host_variables
+    # return a copy so callers cannot modify the cached info
+    return dict(host_variables)
+
+
+def _get_transport_variables(es: Elasticsearch) -> Dict[str, Any]:
+    """Extracts the Elasticsearch connection info from a client object.
+
+    Args:
+        es: Elasticsearch client object
+
+    Raises:
+        TypeError: If the passed client object is not connected to a host
+
+    Returns:
+        Host connection information dict
+    """
     if es.transport.hosts is not None and len(es.transport.hosts) > 0:
         # get the first host
         host = es.transport.hosts[0]
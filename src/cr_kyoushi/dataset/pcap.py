@@ -2,6 +2,7 @@
 
 import io
 import re
+import shutil
 import subprocess
 
 from distutils.version import LooseVersion
@@ -19,6 +20,10 @@ from pyshark.tshark.tshark import (
 )
 
 
+_COPY_BUFFER_SIZE = 1024 * 1024
+"""The number of characters copied at once for unfiltered conversions"""
+
+
 def __pcap_ecs_remove_filtered(el: Any, canary: object) -> Any:
     if isinstance(el, dict):
         # if its an empty dict return as is
@@ -141,15 +146,22 @@ def convert_pcap_to_ecs(
         args.extend(["-j", protocol_match_filter_parent])
 
     proc = subprocess.Popen(args, stdout=subprocess.PIPE)
-    # regex used to skip all index lines from the bulk format
-    index_regex = re.compile(r'{"index":{"_index":".*","_type":".*"}}')
+    assert proc.stdout is not None, "TShark process stdout should be available"
+    # invalid utf-8 sequences are replaced so the output is always valid utf-8
+    lines = io.TextIOWrapper(proc.stdout, encoding="utf-8", errors="replace")
     with open(dest, "w") as dest_file:
-        assert proc.stdout is not None, "TShark process stdout should be available"
-        for line in io.TextIOWrapper(proc.stdout, encoding="utf-8", errors='replace'):
-            # when remove index is true discard all index lines
-            if not remove_index_messages or not index_regex.match(line):
-                if remove_filtered:
-                    line = pcap_ecs_remove_filtered(line)
-                dest_file.write(line)
+        if not remove_index_messages and not remove_filtered:
+            # the output is written as is so it can be copied in large blocks
+            # instead of line by line
+            shutil.copyfileobj(lines, dest_file, _COPY_BUFFER_SIZE)
+        else:
+            # regex used to skip all index lines from the bulk format
+            index_regex = re.compile(r'{"index":{"_index":".*","_type":".*"}}')
+            for line in lines:
+                # when remove index is true discard all index lines
+                if not remove_index_messages or not index_regex.match(line):
+                    if remove_filtered:
+                        line = pcap_ecs_remove_filtered(line)
+                    dest_file.write(line)
     # ensure tshark process has finished
     proc.wait()
@@ -4,27 +4,30 @@ the core processors shipped with the Cyber Range Kyoushi Dataset package.
 """
 
 
-import copy
-import gzip
-import shutil
+import os
 import sys
 
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from itertools import (
+    chain,
+    islice,
+)
 from pathlib import Path
 from typing import (
     Any,
+    BinaryIO,
     ClassVar,
     Dict,
-    Iterable,
+    FrozenSet,
     List,
     Optional,
+    Set,
+    Tuple,
     Union,
 )
 
 from elasticsearch import Elasticsearch
-from elasticsearch.client.cluster import ClusterClient
-from elasticsearch.client.indices import IndicesClient
-from elasticsearch.client.ingest import IngestClient
 from elasticsearch_dsl.query import Range
 from elasticsearch_dsl.response.aggs import Bucket
 from elasticsearch_dsl.search import Search
@@ -33,6 +36,7 @@ from pydantic import (
     BaseModel,
     Field,
     FilePath,
+    ValidationError,
     parse_obj_as,
     validator,
 )
@@ -48,18 +52,34 @@ from .elasticsearch import (
 )
 from .pcap import convert_pcap_to_ecs
 from .templates import (
-    render_template,
+    render_template_recursive,
     write_template,
+    write_templates,
 )
 from .utils import (
     copy_package_file,
     create_dirs,
-    load_file,
+    fast_glob,
+    load_file_cached,
     load_variables,
     trim_file,
 )
 
 
+try:
+    # prefer the Intel ISA-L accelerated gzip implementation if it is installed
+    from isal import igzip as gzip
+except ImportError:
+    import gzip
+
+try:
+    # rapidgzip can decompress a single gzip file using multiple threads
+    import rapidgzip
+
+    HAS_RAPIDGZIP = True
+except ImportError:
+    HAS_RAPIDGZIP = False
+
 if sys.version_info >= (3, 8):
     from typing import (
         Protocol,
@@ -105,6 +125,8 @@ class ProcessorContext(BaseModel):
             A single dict containing all context variables.
         """
         if self._loaded_variables is None:
+            # templates can modify the variables (e.g., using the do extension)
+            # so each context gets its own copy of the cached file data
             self._loaded_variables = load_variables(self.variable_files)
             self._loaded_variables.update(self.variables)
         return self._loaded_variables
@@ -137,7 +159,9 @@ class Processor(Protocol):
     """
 
     type_: ClassVar[str]
-    context_render_exclude: ClassVar[List[str]]
+    context_render_exclude: ClassVar[FrozenSet[str]]
+    parallel: ClassVar[bool]
+    is_container: ClassVar[bool]
     context: ProcessorContext
     name: str
 
@@ -196,7 +220,11 @@ class ProcessorBase(BaseModel):
     """
 
     type_: ClassVar[str] = Field(..., description="The processor type")
-    context_render_exclude: ClassVar[List[str]] = []
+    context_render_exclude: ClassVar[FrozenSet[str]] = frozenset()
+    parallel: ClassVar[bool] = False
+    """If consecutive instances of the processor can be executed in parallel"""
+    is_container: ClassVar[bool] = False
+    """If the processor is a processor container (see `ProcessorContainer`)"""
     context: ProcessorContext = Field(
         ProcessorContext(),
         description="The variable context for the processor",
@@ -208,6 +236,15 @@ class ProcessorBase(BaseModel):
         alias="type",
     )
 
+    def __init_subclass__(cls, **kwargs):
+        """Prepare the class variables of processor implementations.
+
+        The `context_render_exclude` fields are converted to a frozenset
+        so that processors can still define them as list or tuple.
+        """
+        super().__init_subclass__(**kwargs)
+        cls.context_render_exclude = frozenset(cls.context_render_exclude)
+
     @classmethod
     def _render(
         cls,
@@ -225,26 +262,7 @@ class ProcessorBase(BaseModel):
         Returns:
             The rendered data element
         """
-        # handle sub dicts
-        if isinstance(data, dict):
-            data_rendered = {}
-            for key, val in data.items():
-                # for sub dicts keys we also allow temp
-                key = cls._render(context, key, es)
-                val = cls._render(context, val, es)
-                data_rendered[key] = val
-            return data_rendered
-
-        # handle list elements
-        if isinstance(data, list):
-            return [cls._render(context, val, es) for val in data]
-
-        # handle str and template strings
-        if isinstance(data, str):
-            return render_template(data, context.load(), es)
-
-        # all other basic types are returned as is
-        return data
+        return render_template_recursive(data, context.load(), es)
 
     @classmethod
     def render(
@@ -262,15 +280,20 @@ class ProcessorBase(BaseModel):
         Returns:
             The rendered processor configuration.
         """
-        # handle main dict
-        data_rendered = {}
-        for key, val in data.items():
-            # do not render excluded fields
-            if key not in cls.context_render_exclude:
-                data_rendered[key] = cls._render(context, val, es)
-            else:
-                data_rendered[key] = val
-        return data_rendered
+        exclude = cls.context_render_exclude
+        # render all fields in a single pass, the values are passed as list
+        # since the keys of the main dict must not be rendered
+        rendered = iter(
+            cls._render(
+                context,
+                [val for key, val in data.items() if key not in exclude],
+                es,
+            )
+        )
+        # do not render excluded fields
+        return {
+            key: val if key in exclude else next(rendered) for key, val in data.items()
+        }
 
     def execute(
         self,
@@ -289,6 +312,26 @@ class ProcessorBase(BaseModel):
         """
         raise NotImplementedError("Incomplete processor implementation!")
 
+    def input_files(self) -> List[Path]:
+        """Get the files read by the processor.
+
+        Used to detect dependencies between batched parallel processors.
+
+        Returns:
+            The input file paths
+        """
+        return []
+
+    def output_files(self) -> List[Path]:
+        """Get the files written by the processor.
+
+        Used to detect dependencies between batched parallel processors.
+
+        Returns:
+            The output file paths
+        """
+        return []
+
 
 ProcessorList = List[ProcessorBase]
 """Type alias for a list of processors"""
@@ -330,7 +373,8 @@ class ForEachProcessor(ProcessorBase):
     """
 
     type_: ClassVar = "foreach"
-    context_render_exclude: ClassVar[List[str]] = ["processor"]
+    context_render_exclude: ClassVar[FrozenSet[str]] = frozenset({"processor"})
+    is_container: ClassVar[bool] = True
 
     items: List[Any] = Field(
         ...,
@@ -345,6 +389,23 @@ class ForEachProcessor(ProcessorBase):
         description="The processor template config to create multiple instances of",
     )
 
+    @validator("processor")
+    def validate_processor(cls, v: Dict[str, Any]) -> Dict[str, Any]:
+        """Pre-validate the processor template.
+
+        The created processors only differ in their loop variable so
+        validating the template once replaces the pre-validation of
+        each created processor.
+
+        Args:
+            v: The processor template config
+
+        Returns:
+            The unchanged processor template config
+        """
+        ProcessorBase.parse_obj(v)
+        return v
+
     def processors(self) -> List[Dict[str, Any]]:
         """Create a list of processors for each item.
 
@@ -352,19 +413,21 @@ class ForEachProcessor(ProcessorBase):
             List of processors based on the given items and
             processor template.
         """
+        context = self.processor.get("context")
+        if context is None:
+            context = self.context.dict()
+        variables = context.get("vars", {})
+
         processors = []
         for item in self.items:
-            processor = copy.deepcopy(self.processor)
-            # set the loop var
-            if "context" in processor:
-                context = processor["context"]
-            else:
-                context = self.context.dict()
-                processor["context"] = context
-
-            variables = context.setdefault("vars", {})
-            variables[self.loop_var] = item
-
+            # the processors only differ in their loop var so only the dicts
+            # containing it are copied, the rest of the template is shared
+            # since rendering always creates new data
+            processor = dict(self.processor)
+            processor["context"] = {
+                **context,
+                "vars": {**variables, self.loop_var: item},
+            }
             processors.append(processor)
         return processors
 
@@ -516,6 +579,60 @@ class CreateDirectoryProcessor(ProcessorBase):
         self.path.mkdir(parents=self.recursive, exist_ok=True)
 
 
+_GUNZIP_PARALLEL_FILE_SIZE = 64 * 1024 * 1024
+"""Gzip files from this size on are decompressed in parallel if rapidgzip is installed"""
+
+
+_GUNZIP_BUFFER_SIZE = 4 * 1024 * 1024
+"""The read buffer size used for streaming gzip decompression"""
+
+
+def _write_all(f_out: BinaryIO, data: Union[bytes, memoryview]):
+    """Write all data to an unbuffered file.
+
+    Unbuffered (raw) files might only write parts of the given
+    data so this retries until everything has been written.
+
+    Args:
+        f_out: The unbuffered file to write to
+        data: The data to write
+    """
+    view = memoryview(data)
+    while view:
+        written = f_out.write(view)
+        view = view[written:]
+
+
+def _gunzip(gzip_file: Path, parallel: bool = False) -> Path:
+    """Decompress a gzip file into the same directory.
+
+    Args:
+        gzip_file: The gzip file to decompress
+        parallel: If large files may be decompressed using all cores
+                  (i.e., the file is not decompressed alongside others)
+
+    Returns:
+        The path of the decompressed gzip file
+    """
+    # with suffix replaces .gz ending
+    dest = gzip_file.with_suffix("")
+    size = os.path.getsize(gzip_file)
+    # we only issue large writes so the file object does not need its own buffer
+    with open(dest, "wb", buffering=0) as f_out:
+        # files are always streamed so the memory use is bounded by the buffer size
+        # regardless of the (unknown) decompressed size
+        f_in: BinaryIO
+        if parallel and HAS_RAPIDGZIP and size >= _GUNZIP_PARALLEL_FILE_SIZE:
+            f_in = rapidgzip.open(str(gzip_file), parallelization=os.cpu_count() or 1)
+        else:
+            f_in = gzip.open(gzip_file, "rb")
+        with f_in:
+            # use a large buffer to reduce the number of read and write calls
+            for chunk in iter(lambda: f_in.read(_GUNZIP_BUFFER_SIZE), b""):
+                _write_all(f_out, chunk)
+    return gzip_file
+
+
 class GzipProcessor(ProcessorBase):
     """Processor for decompressing gzip files.
 
@@ -523,6 +640,14 @@ class GzipProcessor(ProcessorBase):
     or a `path` to a single gzip file. If a `glob` is defined
     it is resolved relative to the defined `path` (default=`<dataset dir>`).
 
+    !!! Note
+        If the optional `isal` package is installed (`kyoushi-dataset[isal]`)
+        its accelerated gzip implementation is used for decompressing the files.
+        Large files (64 MiB and more) are decompressed using multiple threads
+        if the optional `rapidgzip` package is installed (`kyoushi-dataset[rapidgzip]`)
+        and the file is decompressed on its own (i.e., a `path` or a `glob`
+        matching a single file).
+
     Example:
         ```yaml
         - name: Decompress all GZIP logs
@@ -554,18 +679,33 @@ class GzipProcessor(ProcessorBase):
             parser_config: The dataset parser configuration
             es: The elasticsearch client object
         """
-        files: Iterable
         if self.glob is None:
-            files = [self.path]
+            gzip_files = iter([self.path])
+        else:
+            gzip_files = iter(fast_glob(self.path, self.glob))
+        # only look ahead far enough to know if there are multiple files
+        first_files = list(islice(gzip_files, 2))
+
+        if len(first_files) < 2:
+            # a single file is decompressed directly without the thread pool overhead
+            # and can use all cores for itself
+            decompressed = [_gunzip(f, parallel=True) for f in first_files]
         else:
-            files = self.path.glob(self.glob)
-        for gzip_file in files:
-            with gzip.open(gzip_file, "rb") as f_in:
-                # with suffix replaces .gz ending
-                with open(gzip_file.with_suffix(""), "wb") as f_out:
-                    shutil.copyfileobj(f_in, f_out)
-            # delete the gzip file
-            gzip_file.unlink()
+            # the files are independent of each other and both zlib and ISA-L
+            # release the GIL while decompressing so we can use parallel threads
+            # each file is decompressed by a single thread to not oversubscribe the CPU
+            with ThreadPoolExecutor(
+                max_workers=min(32, (os.cpu_count() or 1) * 4)
+            ) as executor:
+                # the glob is resolved lazily while the executor submits the files
+                # so the first files are already decompressed while the search continues
+                decompressed = list(
+                    executor.map(_gunzip, chain(first_files, gzip_files))
+                )
+
+        # only delete the gzip files once all of them have been decompressed
+        for gzip_file in decompressed:
+            os.unlink(gzip_file)
 
 
 class PcapElasticsearchProcessor(ProcessorBase):
@@ -586,6 +726,9 @@ class PcapElasticsearchProcessor(ProcessorBase):
     """
 
     type_: ClassVar = "pcap.elasticsearch"
+    # each conversion runs in its own tshark process
+    parallel: ClassVar[bool] = True
+
     pcap: FilePath = Field(..., description="The pcap file to convert")
     dest: Path = Field(..., description="The destination file")
     tls_keylog: Optional[FilePath] = Field(
@@ -650,6 +793,24 @@ class PcapElasticsearchProcessor(ProcessorBase):
         description="If the pcap should be created even when the destination file already exists.",
     )
 
+    def input_files(self) -> List[Path]:
+        """Get the pcap and TLS keylog files read by the processor.
+
+        Returns:
+            The input file paths
+        """
+        if self.tls_keylog is not None:
+            return [self.pcap, self.tls_keylog]
+        return [self.pcap]
+
+    def output_files(self) -> List[Path]:
+        """Get the destination file written by the processor.
+
+        Returns:
+            The output file paths
+        """
+        return [self.dest]
+
     def execute(
         self,
         dataset_dir: Path,
@@ -731,11 +892,9 @@ class ComponentTemplateCreateProcessor(ProcessorBase):
             parser_config: The dataset parser configuration
             es: The elasticsearch client object
         """
-        template_data = load_file(self.template)
-
-        ies = ClusterClient(es)
+        template_data = load_file_cached(self.template)
 
-        ies.put_component_template(
+        es.cluster.put_component_template(
             name=self.template_name,
             body=template_data,
             create=self.create_only,
@@ -812,7 +971,7 @@ class TemplateCreateProcessor(ProcessorBase):
             parser_config: The dataset parser configuration
             es: The elasticsearch client object
         """
-        template_data = load_file(self.template)
+        template_data = load_file_cached(self.template)
 
         # configure the index patterns
         if self.index_patterns is not None:
@@ -830,9 +989,7 @@ class TemplateCreateProcessor(ProcessorBase):
         if self.composed_of is not None:
             template_data["composed_of"] = self.composed_of
 
-        ies = IndicesClient(es)
-
-        ies.put_index_template(
+        es.indices.put_index_template(
             name=self.template_name,
             body=template_data,
             create=self.create_only,
@@ -904,7 +1061,7 @@ class LegacyTemplateCreateProcessor(ProcessorBase):
             parser_config: The dataset parser configuration
             es: The elasticsearch client object
         """
-        template_data = load_file(self.template)
+        template_data = load_file_cached(self.template)
 
         # configure the index patterns
         if self.index_patterns is not None:
@@ -916,9 +1073,7 @@ class LegacyTemplateCreateProcessor(ProcessorBase):
                 else self.index_patterns
             )
 
-        ies = IndicesClient(es)
-
-        ies.put_template(
+        es.indices.put_template(
             name=self.template_name,
             body=template_data,
             create=self.create_only,
@@ -966,11 +1121,9 @@ class IngestCreateProcessor(ProcessorBase):
             parser_config: The dataset parser configuration
             es: The elasticsearch client object
         """
-        pipeline_data = load_file(self.ingest_pipeline)
-
-        ies = IngestClient(es)
+        pipeline_data = load_file_cached(self.ingest_pipeline)
 
-        ies.put_pipeline(id=self.ingest_pipeline_id, body=pipeline_data)
+        es.ingest.put_pipeline(id=self.ingest_pipeline_id, body=pipeline_data)
 
 
 class LogstashSetupProcessor(ProcessorBase):
@@ -1150,65 +1303,49 @@ class LogstashSetupProcessor(ProcessorBase):
             parser_config.settings_dir.joinpath("log4j2.properties"),
         )
 
-        # write logstash configuration
-        write_template(
-            self.logstash_template,
-            parser_config.settings_dir.joinpath("logstash.yml"),
-            variables,
-            es,
-        )
-
-        # write pipelines configuration
-        write_template(
-            self.piplines_template,
-            parser_config.settings_dir.joinpath("pipelines.yml"),
-            variables,
-            es,
-        )
-
-        # write index template
-        write_template(
-            self.index_template_template,
-            parser_config.settings_dir.joinpath(
-                f"{dataset_config.name}-index-template.json"
+        templates = [
+            # logstash configuration
+            (
+                self.logstash_template,
+                parser_config.settings_dir.joinpath("logstash.yml"),
             ),
-            variables,
-            es,
-        )
-
-        # write legacy index template
-        write_template(
-            self.legacy_index_template_template,
-            parser_config.settings_dir.joinpath(
-                f"{dataset_config.name}-legacy-index-template.json"
+            # pipelines configuration
+            (
+                self.piplines_template,
+                parser_config.settings_dir.joinpath("pipelines.yml"),
             ),
-            variables,
-            es,
-        )
-
-        # write input configuration
-        write_template(
-            self.input_template,
-            parser_config.conf_dir.joinpath(self.input_config_name),
-            variables,
-            es,
-        )
-
-        # write output configuration
-        write_template(
-            self.output_template,
-            parser_config.conf_dir.joinpath(self.output_config_name),
-            variables,
-            es,
-        )
+            # index template
+            (
+                self.index_template_template,
+                parser_config.settings_dir.joinpath(
+                    f"{dataset_config.name}-index-template.json"
+                ),
+            ),
+            # legacy index template
+            (
+                self.legacy_index_template_template,
+                parser_config.settings_dir.joinpath(
+                    f"{dataset_config.name}-legacy-index-template.json"
+                ),
+            ),
+            # input configuration
+            (
+                self.input_template,
+                parser_config.conf_dir.joinpath(self.input_config_name),
+            ),
+            # output configuration
+            (
+                self.output_template,
+                parser_config.conf_dir.joinpath(self.output_config_name),
+            ),
+            # pre process configuration
+            (
+                self.pre_process_template,
+                parser_config.conf_dir.joinpath(self.pre_process_name),
+            ),
+        ]
 
-        # write pre process configuration
-        write_template(
-            self.pre_process_template,
-            parser_config.conf_dir.joinpath(self.pre_process_name),
-            variables,
-            es,
-        )
+        write_templates(templates, variables, es)
 
 
 class TrimProcessor(ProcessorBase):
@@ -1236,6 +1373,9 @@ class TrimProcessor(ProcessorBase):
     """
 
     type_: ClassVar = "dataset.trim"
+    update_chunk_size: ClassVar[int] = 200
+    """The maximum number of log files to adjust line numbers for per update query"""
+
     start: Optional[datetime] = Field(
         None,
         description="The start time to trim the logs to (defaults to dataset start)",
@@ -1352,9 +1492,10 @@ class TrimProcessor(ProcessorBase):
         index = indices + exclude
 
         # get documents before trim
+        # (only the doc counts are needed so we skip the line stats aggregation)
         docs_before = {
             bucket.key.path: bucket.doc_count
-            for bucket in self.get_line_stats(es, index)
+            for bucket in self.get_doc_stats(es, index)
         }
 
         remove = Search(using=es, index=index)
@@ -1371,7 +1512,8 @@ class TrimProcessor(ProcessorBase):
         # lines after trim
         lines_after = self.get_line_stats(es, index)
 
-        # trim each file
+        # collect the trim ranges for each file
+        trim_tasks = []
         for bucket in lines_after:
             first_line = int(bucket.min_line.value)
             last_line: Optional[int] = int(bucket.max_line.value)
@@ -1380,21 +1522,26 @@ class TrimProcessor(ProcessorBase):
                 # since truncating requires us to read up to the truncate point
                 last_line = None
 
-            trim_file(bucket.key.path, first_line, last_line)
-            # delete entry for this file so we later can detect if a file must be deleted completely
-            del docs_before[bucket.key.path]
+            # files still starting at the first line and ending at the
+            # correct last line do not have to be rewritten at all
+            if first_line > 1 or last_line is not None:
+                trim_tasks.append((bucket.key.path, first_line, last_line))
 
-        # any file that still has a docs before entry
+        # the files are independent of each other so we can trim them concurrently
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            # consume the results to ensure errors are raised
+            list(executor.map(lambda task: trim_file(*task), trim_tasks))
+
+        # any file that had docs before but does not have any line stats anymore
         # does not have any logs within the trim range and thus should be deleted
-        for path in docs_before.keys():
+        remaining_paths = {bucket.key.path for bucket in lines_after}
+        for path in sorted(docs_before.keys() - remaining_paths):
             print(
                 f"Removing {path} as it does not have any log lines within the observation time."
             )
             # delete the file
             Path(path).unlink()
 
-        # update entries in elastic search
-        update_lines = UpdateByQuery(using=es, index=index)
         # adjust map for shifting line numbers in the db to start at our new min line
         adjust_map = {
             bucket.key.path: int(bucket.min_line.value - 1)
@@ -1403,23 +1550,44 @@ class TrimProcessor(ProcessorBase):
             if int(bucket.min_line.value - 1) > 0
         }
 
-        # we only have entries to update if the adjust map is non empty
-        if len(adjust_map) > 0:
-            # pre filter our update query to only include file paths we
-            # want to update
-            update_lines = update_lines.filter(
-                "terms",
-                log__file__path=list(adjust_map.keys()),
+        # split the adjust map into chunks to keep the script params small
+        # the chunks are updated one after another since each update is
+        # already parallelized by elasticsearch (sliced update by query)
+        adjust_items = list(adjust_map.items())
+        for i in range(0, len(adjust_items), self.update_chunk_size):
+            self.update_line_numbers(
+                es, index, dict(adjust_items[i : i + self.update_chunk_size])
             )
 
-            # ToDO might be better as async query due to threat of timeouts
-            # (i.e., update_lines.to_dict() and then use low level async API)
-            update_lines.script(
-                lang="painless",
-                # subtract matching the entries log file path
-                source="ctx._source.log.file.line -= params[ctx._source.log.file.path]",
-                params=adjust_map,
-            ).execute()
+    def update_line_numbers(
+        self,
+        es: Elasticsearch,
+        index: List[str],
+        adjust_map: Dict[str, int],
+    ):
+        """Shift the line numbers of the given log files in elasticsearch.
+
+        Args:
+            es: The elasticsearch client object
+            index: The indices to update
+            adjust_map: Map of log file paths to the number of lines to subtract
+        """
+        # update entries in elastic search
+        update_lines = UpdateByQuery(using=es, index=index)
+
+        # pre filter our update query to only include file paths we
+        # want to update
+        update_lines = update_lines.filter(
+            "terms",
+            log__file__path=list(adjust_map.keys()),
+        )
+
+        update_lines.script(
+            lang="painless",
+            # subtract matching the entries log file path
+            source="ctx._source.log.file.line -= params[ctx._source.log.file.path]",
+            params=adjust_map,
+        ).params(slices="auto").execute()
 
 
 class ProcessorPipeline:
@@ -1456,6 +1624,61 @@ class ProcessorPipeline:
             }
         )
 
+    def plan(
+        self,
+        data: List[Dict[str, Any]],
+        validate: bool = True,
+    ) -> List[Tuple[Any, ProcessorContext, Dict[str, Any]]]:
+        """Prepares the execution of a list of processors.
+
+        Validates the processor list and resolves the processor classes
+        and contexts so that configuration errors are raised before
+        any of the processors is executed. The processors themselves
+        can only be rendered and parsed right before their execution
+        since they might depend on the results of earlier processors.
+
+        Args:
+            data: The raw processor information
+            validate: If the processor list should be pre-validated
+
+        Raises:
+            ValueError: If a processor type is not known
+
+        Returns:
+            List of processor class, context and raw processor tuples
+        """
+        # pre-validate the processor list
+        # check if all processors have a name and type
+        validated: Optional[List[ProcessorBase]] = None
+        if validate:
+            validated = parse_obj_as(ProcessorList, data)
+
+        steps = []
+        for i, p in enumerate(data):
+            # get the processor context and class
+            context = p.get("context")
+            if context is None:
+                context = {}
+                p["context"] = context
+
+            processor_class = self.processor_map.get(p["type"])
+            if processor_class is None:
+                raise ValueError(
+                    f"Unknown processor type '{p['type']}' for processor '{p['name']}'"
+                )
+
+            steps.append(
+                (
+                    processor_class,
+                    # reuse the context already parsed during the pre-validation
+                    validated[i].context
+                    if validated is not None
+                    else ProcessorContext.parse_obj(context),
+                    p,
+                )
+            )
+        return steps
+
     def execute(
         self,
         data: List[Dict[str, Any]],
@@ -1463,6 +1686,7 @@ class ProcessorPipeline:
         dataset_config: DatasetConfig,
         parser_config: LogstashParserConfig,
         es: Elasticsearch,
+        _validated: bool = False,
     ):
         """Executes the processor pipeline by running all the configured processors.
 
@@ -1472,25 +1696,51 @@ class ProcessorPipeline:
             dataset_config: The dataset configuration
             parser_config: The dataset parser configuration
             es: The elasticsearch client object
+            _validated: If the processor list has already been pre-validated
         """
-        # pre-validate the processor list
-        # check if all processors have a name and type
-        parse_obj_as(ProcessorList, data)
-
-        for p in data:
-            # get the processor context and class
-            context = p.setdefault("context", {})
-            processor_class = self.processor_map[p["type"]]
-
-            # render the processor template and parse it
-            p_rendered = processor_class.render(
-                context=ProcessorContext.parse_obj(context),
-                data=p,
-                es=es,
-            )
-            processor = processor_class.parse_obj(p_rendered)
+        parallel_batch: List[ProcessorBase] = []
+        # the resolved input and output files of the batched processors
+        batch_inputs: Set[Path] = set()
+        batch_outputs: Set[Path] = set()
+        for processor_class, context, p in self.plan(data, validate=not _validated):
+            # other processors might depend on the results of the batched
+            # parallel processors so the batch has to be finished first
+            if not processor_class.parallel and parallel_batch:
+                self._execute_parallel(
+                    parallel_batch, dataset_dir, dataset_config, parser_config, es
+                )
+                parallel_batch = []
+                batch_inputs = set()
+                batch_outputs = set()
+
+            if parallel_batch:
+                # the processor is rendered and validated before the batched
+                # processors have run, so only the files existing before the
+                # batch are visible to it
+                processor: Any = None
+                try:
+                    processor = self._parse(processor_class, context, p, es)
+                except ValidationError:
+                    # might depend on a file that does not exist yet
+                    pass
+
+                if processor is None or self._depends_on_batch(
+                    processor, batch_inputs, batch_outputs
+                ):
+                    # finish the batch to keep the order of the file accesses
+                    # and render the processor again to see the batch results
+                    self._execute_parallel(
+                        parallel_batch, dataset_dir, dataset_config, parser_config, es
+                    )
+                    parallel_batch = []
+                    batch_inputs = set()
+                    batch_outputs = set()
+                    processor = self._parse(processor_class, context, p, es)
+            else:
+                processor = self._parse(processor_class, context, p, es)
 
-            if isinstance(processor, ProcessorContainer):
+            # class flag instead of a much slower runtime protocol check
+            if processor.is_container:
                 print(f"Expanding processor container - {processor.name} ...")
                 self.execute(
                     processor.processors(),
@@ -1498,7 +1748,127 @@ class ProcessorPipeline:
                     dataset_config,
                     parser_config,
                     es,
+                    # container processors validate their processor templates
+                    _validated=True,
+                )
+            elif processor.parallel:
+                parallel_batch.append(processor)
+                batch_inputs.update(path.resolve() for path in processor.input_files())
+                batch_outputs.update(
+                    path.resolve() for path in processor.output_files()
                 )
             else:
-                print(f"Executing - {processor.name} ...")
-                processor.execute(dataset_dir, dataset_config, parser_config, es)
+                self._execute_processor(
+                    processor, dataset_dir, dataset_config, parser_config, es
+                )
+
+        if parallel_batch:
+            self._execute_parallel(
+                parallel_batch, dataset_dir, dataset_config, parser_config, es
+            )
+
+    def _depends_on_batch(
+        self,
+        processor: ProcessorBase,
+        batch_inputs: Set[Path],
+        batch_outputs: Set[Path],
+    ) -> bool:
+        """Check if a processor must run after the batched parallel processors.
+
+        This is the case if the processor reads a file written by the batch,
+        or writes a file read or written by the batch.
+
+        Args:
+            processor: The parsed processor
+            batch_inputs: The resolved input files of the batched processors
+            batch_outputs: The resolved output files of the batched processors
+
+        Returns:
+            `True` if the processor depends on the batch `False` otherwise
+        """
+        inputs = {path.resolve() for path in processor.input_files()}
+        outputs = {path.resolve() for path in processor.output_files()}
+        return (
+            not inputs.isdisjoint(batch_outputs)
+            or not outputs.isdisjoint(batch_inputs)
+            or not outputs.isdisjoint(batch_outputs)
+        )
+
+    def _parse(
+        self,
+        processor_class: Any,
+        context: ProcessorContext,
+        data: Dict[str, Any],
+        es: Elasticsearch,
+    ) -> Any:
+        """Renders the processor template and parses it.
+
+        Args:
+            processor_class: The processor class
+            context: The processor context
+            data: The raw processor information
+            es: The elasticsearch client object
+
+        Returns:
+            The parsed processor
+        """
+        p_rendered = processor_class.render(
+            context=context,
+            data=data,
+            es=es,
+        )
+        return processor_class.parse_obj(p_rendered)
+
+    def _execute_processor(
+        self,
+        processor: ProcessorBase,
+        dataset_dir: Path,
+        dataset_config: DatasetConfig,
+        parser_config: LogstashParserConfig,
+        es: Elasticsearch,
+    ):
+        """Executes a single parsed processor.
+
+        Args:
+            processor: The parsed processor to execute
+            dataset_dir: The dataset path
+            dataset_config: The dataset configuration
+            parser_config: The dataset parser configuration
+            es: The elasticsearch client object
+        """
+        print(f"Executing - {processor.name} ...")
+        processor.execute(dataset_dir, dataset_config, parser_config, es)
+
+    def _execute_parallel(
+        self,
+        processors: List[ProcessorBase],
+        dataset_dir: Path,
+        dataset_config: DatasetConfig,
+        parser_config: LogstashParserConfig,
+        es: Elasticsearch,
+    ):
+        """Executes a batch of independent processors in parallel.
+
+        Threads are used since the parallel processors spend their
+        time waiting on external processes and the elasticsearch
+        client cannot be shared with other processes.
+
+        Args:
+            processors: The parsed processors to execute
+            dataset_dir: The dataset path
+            dataset_config: The dataset configuration
+            parser_config: The dataset parser configuration
+            es: The elasticsearch client object
+        """
+        with ThreadPoolExecutor(
+            max_workers=min(len(processors), os.cpu_count() or 1)
+        ) as executor:
+            # consume the results to ensure errors are raised
+            list(
+                executor.map(
+                    lambda processor: self._execute_processor(
+                        processor, dataset_dir, dataset_config, parser_config, es
+                    ),
+                    processors,
+                )
+            )
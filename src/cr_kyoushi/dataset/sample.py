@@ -1,22 +1,77 @@
 """This module contains utility functions used for sampling processed datasets."""
 
+import functools
+import io
+import os
+import threading
+
+from array import array
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from itertools import islice
 from pathlib import Path
 from typing import (
     Any,
     Dict,
+    Iterable,
+    Iterator,
     List,
     Optional,
+    Tuple,
     Union,
 )
 
 from elasticsearch import Elasticsearch
-from elasticsearch_dsl import Search
+from elasticsearch_dsl import (
+    MultiSearch,
+    Search,
+)
 from elasticsearch_dsl.query import Range
+from elasticsearch_dsl.response import Response
 from elasticsearch_dsl.response.hit import Hit
 
 
-def get_sample(
+_MAX_RESULT_WINDOW = 10_000
+"""The default maximum number of hits a single elasticsearch search can return"""
+
+_SCAN_BATCH_SIZE = 1_000
+"""The number of sample lines to retrieve per scroll request"""
+
+
+@functools.lru_cache(maxsize=32)
+def _label_fields(label_object: str) -> Tuple[str, str]:
+    """Get the label list and label rules field names.
+
+    Args:
+        label_object: The field that contains the labeling data
+
+    Returns:
+        The label list field and the label rules field
+    """
+    return (f"{label_object}.list", f"{label_object}.rules")
+
+
+@functools.lru_cache(maxsize=32)
+def _sample_source_fields(label_object: str) -> Tuple[str, ...]:
+    """Get the source fields to retrieve for sample log lines.
+
+    Args:
+        label_object: The field that contains the labeling data
+
+    Returns:
+        The source fields
+    """
+    return (
+        "@timestamp",
+        "log",
+        *_label_fields(label_object),
+        "type",
+        "_score",
+        "_seq_no",
+    )
+
+
+def _sample_search(
     es: Elasticsearch,
     label_filter_script_id: str,
     labels: Optional[List[str]],
@@ -28,33 +83,15 @@ def get_sample(
     seed_field: str = "_seq_no",
     start: Union[str, datetime, float, None] = None,
     stop: Union[str, datetime, float, None] = None,
-) -> List[Hit]:
-    """Retrieve a list of sample log lines.
+    terminate_after: Optional[int] = None,
+    preference: Optional[str] = None,
+) -> Search:
+    """Utility function for creating the random sample search.
 
-    Args:
-        es: The elasticsearch client object
-        label_filter_script_id: The kyoushi filter scripts ID
-        labels: The labels to sample from
-        files: The log files to sample from
-        index: The elasticsearch indices to sample from
-        label_object: The field that contains the labeling data
-        size: The number of lines to sample
-        seed: The seed to use for the sample randomization
-        seed_field: The elasticsearch field to use for the random sample order
-        start: The minimum time stamp to sample from
-        stop: The maximum time stamp to sample from
+    See `get_sample` for details.
 
     Returns:
-        List of randomly sample log lines. Each line being
-        represented as a dict of the following format:
-
-        ```
-        - @timestamp: The log event timestamp
-          log: The elasticsearch log field (containing line number, original log line, etc.)
-          <label_object>.list: List of labels
-          <label_object>.rules: Map of labeling rules applied to the line
-          type: Log type
-        ```
+        The configured sample search
     """
     search = Search(using=es, index=index)
 
@@ -66,7 +103,8 @@ def get_sample(
     if labels is None or len(labels) == 0:
         # if we are given no labels to search for we explicitly return
         # only log rows without any labels
-        search = search.exclude("exists", field=f"{label_object}.rules")
+        _, rules_field = _label_fields(label_object)
+        search = search.exclude("exists", field=rules_field)
     else:
         # if we got a label then we filter for it using our script search filter
         search = search.filter(
@@ -86,32 +124,177 @@ def get_sample(
         search = search.filter(Range(**{"@timestamp": time_range}))
 
     if files is not None and len(files) > 0:
-        search = search.filter(
-            "bool", should=[{"match": {"log.file.path": f}} for f in files]
-        )
+        # log file paths are keywords so a cacheable terms filter is sufficient
+        search = search.filter("terms", log__file__path=files)
 
-    search = search.source(
-        [
-            "@timestamp",
-            "log",
-            f"{label_object}.list",
-            f"{label_object}.rules",
-            "type",
-            "_score",
-            "_seq_no",
-        ]
-    )
+    search = search.source(list(_sample_source_fields(label_object)))
+
+    if terminate_after is not None:
+        search = search.extra(terminate_after=terminate_after)
+
+    if preference is not None:
+        # keep successive searches on the same shard copies to reuse their caches
+        search = search.params(preference=preference)
+
+    return search
+
+
+def get_sample(
+    es: Elasticsearch,
+    label_filter_script_id: str,
+    labels: Optional[List[str]],
+    files: Optional[List[str]] = None,
+    index: Union[List[str], str, None] = None,
+    label_object: str = "kyoushi_labels",
+    size: int = 10,
+    seed: Optional[int] = None,
+    seed_field: str = "_seq_no",
+    start: Union[str, datetime, float, None] = None,
+    stop: Union[str, datetime, float, None] = None,
+    terminate_after: Optional[int] = None,
+    preference: Optional[str] = None,
+) -> List[Hit]:
+    """Retrieve a list of sample log lines.
 
+    !!! Note
+        Setting `terminate_after` limits the number of documents each shard
+        scores for the random sample. This can drastically reduce the query
+        cost for large indices, but the sample is then only drawn from the
+        first matching documents of each shard and thus no longer uniformly random.
+
+    Args:
+        es: The elasticsearch client object
+        label_filter_script_id: The kyoushi filter scripts ID
+        labels: The labels to sample from
+        files: The log files to sample from
+        index: The elasticsearch indices to sample from
+        label_object: The field that contains the labeling data
+        size: The number of lines to sample
+        seed: The seed to use for the sample randomization
+        seed_field: The elasticsearch field to use for the random sample order
+        start: The minimum time stamp to sample from
+        stop: The maximum time stamp to sample from
+        terminate_after: The maximum number of documents to collect per shard
+        preference: The shard copies preference (e.g., `_local`) to use for the search
+
+    Returns:
+        List of randomly sample log lines. Each line being
+        represented as a dict of the following format:
+
+        ```
+        - @timestamp: The log event timestamp
+          log: The elasticsearch log field (containing line number, original log line, etc.)
+          <label_object>.list: List of labels
+          <label_object>.rules: Map of labeling rules applied to the line
+          type: Log type
+        ```
+    """
+    search = _sample_search(
+        es,
+        label_filter_script_id,
+        labels,
+        files,
+        index,
+        label_object,
+        size,
+        seed,
+        seed_field,
+        start,
+        stop,
+        terminate_after,
+        preference,
+    )
     return search.execute().hits
 
 
-def _get_closest(
+def get_sample_iter(
+    es: Elasticsearch,
+    label_filter_script_id: str,
+    labels: Optional[List[str]],
+    files: Optional[List[str]] = None,
+    index: Union[List[str], str, None] = None,
+    label_object: str = "kyoushi_labels",
+    size: int = 10,
+    seed: Optional[int] = None,
+    seed_field: str = "_seq_no",
+    start: Union[str, datetime, float, None] = None,
+    stop: Union[str, datetime, float, None] = None,
+    terminate_after: Optional[int] = None,
+    preference: Optional[str] = None,
+    stream: bool = False,
+) -> Iterator[Hit]:
+    """Iterate over sample log lines.
+
+    Works like `get_sample`, but if `stream` is set or more than
+    `_MAX_RESULT_WINDOW` lines are requested the sample lines are
+    retrieved in batches using the scroll API. This way the sample size is not
+    limited by the indices result window and only one batch is kept in memory.
+
+    !!! Note
+        Setting `terminate_after` limits the number of documents each shard
+        scores for the random sample. This can drastically reduce the query
+        cost for large indices, but the sample is then only drawn from the
+        first matching documents of each shard and thus no longer uniformly random.
+
+    Args:
+        es: The elasticsearch client object
+        label_filter_script_id: The kyoushi filter scripts ID
+        labels: The labels to sample from
+        files: The log files to sample from
+        index: The elasticsearch indices to sample from
+        label_object: The field that contains the labeling data
+        size: The number of lines to sample
+        seed: The seed to use for the sample randomization
+        seed_field: The elasticsearch field to use for the random sample order
+        start: The minimum time stamp to sample from
+        stop: The maximum time stamp to sample from
+        terminate_after: The maximum number of documents to collect per shard
+        preference: The shard copies preference (e.g., `_local`) to use for the search
+        stream: If the sample lines should be retrieved in batches regardless of the size
+
+    Returns:
+        Iterator over randomly sampled log lines. Each line being
+        represented as a dict of the following format:
+
+        ```
+        - @timestamp: The log event timestamp
+          log: The elasticsearch log field (containing line number, original log line, etc.)
+          <label_object>.list: List of labels
+          <label_object>.rules: Map of labeling rules applied to the line
+          type: Log type
+        ```
+    """
+    search = _sample_search(
+        es,
+        label_filter_script_id,
+        labels,
+        files,
+        index,
+        label_object,
+        size,
+        seed,
+        seed_field,
+        start,
+        stop,
+        terminate_after,
+        preference,
+    )
+    if not stream and size <= _MAX_RESULT_WINDOW:
+        yield from search.execute().hits
+        return
+
+    # scroll through the sample in batches while keeping the random order
+    search = search.params(preserve_order=True, size=min(size, _SCAN_BATCH_SIZE))
+    yield from islice(search.scan(), size)
+
+
+def _closest_search(
     es: Elasticsearch,
     related: str,
     timestamp: Union[int, float, str],
     scale: str = "5d",
-) -> Optional[Hit]:
-    """Utility function for retrieving log lines closest to a specified timestamp.
+) -> Search:
+    """Utility function for creating a search for the log line closest to a timestamp.
 
     Args:
         es: The elasticsearch client object
@@ -120,8 +303,7 @@ def _get_closest(
         scale: The maximum distance to include
 
     Returns:
-        Log event in the related index with the closest timestamp.
-        Or `None` if no such event could be found within the scale.
+        Search returning the log event in the related index with the closest timestamp.
     """
     search = Search(using=es, index=related)
 
@@ -132,17 +314,190 @@ def _get_closest(
         boost_mode="multiply",
     )
 
-    hits = (
-        search.sort({"_score": "desc", "log.file.line": "asc"})
-        .extra(size=1)
-        .execute()
-        .hits
-    )
+    # missing related indices simply have no closest log line
+    # instead of failing the whole multi search
+    search = search.params(ignore_unavailable=True, allow_no_indices=True)
+
+    return search.sort({"_score": "desc", "log.file.line": "asc"}).extra(size=1)
+
+
+_LINE_INDEX_STRIDE = 1024
+"""The number of lines between two indexed line offsets"""
+
+
+class _LineIndex:
+    """Sparse line offset index for a log file.
+
+    The index contains the byte offset of every `_LINE_INDEX_STRIDE`-th
+    line so that lines can be read by seeking close to them instead of
+    reading all lines before them. The index is built incrementally,
+    i.e., the file is only scanned up to the lines requested so far.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: The log file path
+        """
+        self.path = path
+        self.offsets = array("Q", [0])
+        self.complete = False
+        # samples are processed concurrently so the index is extended under a lock
+        self.lock = threading.Lock()
+
+    def block_offset(self, block: int) -> Tuple[int, int]:
+        """Get the offset of the closest indexed line block.
+
+        Args:
+            block: The line block (line number divided by `_LINE_INDEX_STRIDE`)
+
+        Returns:
+            The closest indexed block at or before the given block and its offset
+        """
+        with self.lock:
+            if block >= len(self.offsets) and not self.complete:
+                with open(self.path, "rb") as f:
+                    f.seek(self.offsets[-1])
+                    # only scan the file up to the requested block
+                    while block >= len(self.offsets):
+                        lines = list(islice(f, _LINE_INDEX_STRIDE))
+                        if len(lines) < _LINE_INDEX_STRIDE:
+                            self.complete = True
+                            break
+                        self.offsets.append(self.offsets[-1] + sum(map(len, lines)))
+            block = min(block, len(self.offsets) - 1)
+            return block, self.offsets[block]
+
+
+@functools.lru_cache(maxsize=32)
+def _line_index(path: str, size: int, mtime_ns: int) -> _LineIndex:
+    """Get the sparse line offset index for a log file.
+
+    Since multiple samples often come from the same log file the index
+    is cached. The file size and modification time are part of the cache
+    key so that changed files are indexed again.
+
+    Args:
+        path: The log file path
+        size: The size of the log file
+        mtime_ns: The modification time of the log file
+
+    Returns:
+        The line offset index
+    """
+    return _LineIndex(path)
+
+
+def _read_lines(path: Path, start: int, end: int) -> List[str]:
+    """Read a range of lines from a log file.
+
+    Args:
+        path: The log file path
+        start: The number of the first line to read (starting at 1)
+        end: The number of the last line to read
+
+    Returns:
+        The read lines
+    """
+    stat = os.stat(path)
+    index = _line_index(str(path), stat.st_size, stat.st_mtime_ns)
+    block, offset = index.block_offset((start - 1) // _LINE_INDEX_STRIDE)
+    skip = block * _LINE_INDEX_STRIDE
+    with open(path, "rb") as f:
+        f.seek(offset)
+        with io.TextIOWrapper(f) as text:
+            return list(islice(text, start - 1 - skip, end - skip))
+
+
+def _closest_multi_search(
+    es: Elasticsearch,
+    samples: List[Hit],
+    related: List[str],
+) -> List[List[Response]]:
+    """Search the closest log lines of all related indices for multiple samples.
+
+    All searches are sent to elasticsearch in a single multi search request.
+
+    Args:
+        es: The elasticsearch client object
+        samples: The sample log lines
+        related: List of related elasticsearch indices to retrieve neighbor logs from
+
+    Returns:
+        The related index responses of each sample.
+    """
+    multi_search = MultiSearch(using=es)
+    for sample in samples:
+        for rel in related:
+            multi_search = multi_search.add(
+                _closest_search(es=es, related=rel, timestamp=sample["@timestamp"])
+            )
+    responses = list(multi_search.execute())
+    return [
+        responses[i : i + len(related)] for i in range(0, len(responses), len(related))
+    ]
+
+
+def _sample_info(
+    sample: Hit,
+    label: str,
+    gather_dir: Path,
+    before: int,
+    after: int,
+    related_responses: List[Response],
+) -> Dict[str, Any]:
+    """Utility function for creating the verbose information of a sampled log entry.
+
+    Args:
+        sample: The sample log line
+        label: The label that the sample is fore
+        gather_dir: The dataset gather directory
+        before: The number of lines before the sample to fetch
+        after: The number of line after the sample to fetch
+        related_responses: The closest log search responses of the related indices
 
-    if len(hits) < 1:
-        return None
+    Returns:
+        Dictionary containing verbose information about the sample log.
+    """
+
+    path = Path(sample.log.file.path)
+    line_no = sample.log.file.line
+    start = max(1, line_no - before)
+    end = line_no + after
 
-    return hits[0]
+    # read the sample line and the requested surrounding lines
+    window = _read_lines(path, start, end)
+
+    sample_index = line_no - start
+    before_lines: List[str] = window[:sample_index]
+    sample_line: str = window[sample_index]
+    after_lines: List[str] = window[sample_index + 1 :]
+    _related: List[Dict[str, Any]] = []
+    for response in related_responses:
+        if len(response.hits) < 1:
+            continue
+        closest: Hit = response.hits[0]
+        if closest.log.file.path != str(path):
+            _related.append(
+                {
+                    "path": str(Path(closest.log.file.path).relative_to(gather_dir)),
+                    "line_no": closest.log.file.line,
+                    "timestamp": closest["@timestamp"],
+                }
+            )
+
+    return {
+        "label": label,
+        "rules": list(sample.kyoushi_labels.rules)
+        if "kyoushi_labels" in sample
+        else [],
+        "path": str(path.relative_to(gather_dir)),
+        "line_no": line_no,
+        "before": before_lines,
+        "line": sample_line,
+        "after": after_lines,
+        "related": _related,
+    }
 
 
 def get_sample_log(
@@ -185,54 +540,56 @@ def get_sample_log(
         related: <List of log lines in related files with timestamps close to the sample.>
         ```
     """
+    # search the closest log lines of all related indices in a single request
+    related_responses = (
+        _closest_multi_search(es, [sample], related)[0] if related else []
+    )
+    return _sample_info(sample, label, gather_dir, before, after, related_responses)
 
-    path = Path(sample.log.file.path)
-    line_no = sample.log.file.line
-    start = max(0, line_no - before)
-    end = line_no + after
 
-    before_lines: List[str] = []
-    sample_line: str
-    after_lines: List[str] = []
+def get_sample_logs(
+    es: Elasticsearch,
+    samples: Iterable[Hit],
+    label: str,
+    gather_dir: Path,
+    before: int = 5,
+    after: int = 5,
+    related: Optional[List[str]] = None,
+    index: Union[List[str], str, None] = None,
+) -> List[Dict[str, Any]]:
+    """Retrieves additional information for multiple sampled log entries.
 
-    # read the sample line and the requested surrounding lines
-    with open(path, "r") as f:
-        for i, line in enumerate(f, 1):
-            if i >= start and i < line_no:
-                before_lines.append(line)
-            elif i == line_no:
-                sample_line = line
-            elif i > line_no and i <= end:
-                after_lines.append(line)
-            elif i > end:
-                break
-    _related: List[Dict[str, Any]] = []
-    if related is not None:
-        for rel in related:
-            closest: Optional[Hit] = _get_closest(
-                es=es, related=rel, timestamp=sample["@timestamp"]
-            )
-            if closest is not None and closest.log.file.path != str(path):
-                if closest is not None:
-                    _related.append(
-                        {
-                            "path": str(
-                                Path(closest.log.file.path).relative_to(gather_dir)
-                            ),
-                            "line_no": closest.log.file.line,
-                            "timestamp": closest["@timestamp"],
-                        }
-                    )
+    The related logs of all samples are queried with a single
+    multi search request and the samples log files are read
+    concurrently. See `get_sample_log` for details.
 
-    return {
-        "label": label,
-        "rules": list(sample.kyoushi_labels.rules)
-        if "kyoushi_labels" in sample
-        else [],
-        "path": str(path.relative_to(gather_dir)),
-        "line_no": line_no,
-        "before": before_lines,
-        "line": sample_line,
-        "after": after_lines,
-        "related": _related,
-    }
+    Args:
+        es: The elasticsearch client object
+        samples: The sample log lines
+        label: The label that the samples are for
+        gather_dir: The dataset gather directory
+        before: The number of lines before each sample to fetch
+        after: The number of line after each sample to fetch
+        related: List of related elasticsearch indices to retrieve neighbor logs from
+        index: The index the samples were retrieved from
+
+    Returns:
+        List of dictionaries containing verbose information about
+        the sample logs in the order of the given samples.
+    """
+    samples = list(samples)
+    if related and len(samples) > 0:
+        related_responses = _closest_multi_search(es, samples, related)
+    else:
+        related_responses = [[] for _ in samples]
+
+    with ThreadPoolExecutor() as executor:
+        return list(
+            executor.map(
+                lambda sample, responses: _sample_info(
+                    sample, label, gather_dir, before, after, responses
+                ),
+                samples,
+                related_responses,
+            )
+        )
@@ -4,21 +4,29 @@ as part of the processing pipeline and labeling rules.
 """
 
 import functools
+import os
 import re
+import threading
 
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import (
     datetime,
     timedelta,
 )
 from pathlib import Path
+from types import CodeType
 from typing import (
     Any,
+    Callable,
     Dict,
     List,
     Mapping,
     Optional,
+    Pattern,
     Sequence,
     Text,
+    Tuple,
     Union,
 )
 
@@ -30,15 +38,23 @@ from elasticsearch_dsl.query import (
 )
 from elasticsearch_dsl.search import Search
 from jinja2 import (
+    BytecodeCache,
     ChoiceLoader,
+    FileSystemBytecodeCache,
     FileSystemLoader,
     PackageLoader,
     StrictUndefined,
+    Template,
     Undefined,
     contextfunction,
 )
-from jinja2.nativetypes import NativeEnvironment
+from jinja2.bccache import Bucket
+from jinja2.nativetypes import (
+    NativeEnvironment,
+    native_concat,
+)
 from jinja2.runtime import Context
+from jinja2.utils import LRUCache
 from pydantic import parse_obj_as
 
 from .config import DatasetConfig
@@ -48,6 +64,31 @@ from .utils import (
 )
 
 
+@functools.lru_cache(maxsize=4096)
+def _compile(pattern: str, flags: int = 0) -> Pattern[str]:
+    """Cached version of `re.compile`.
+
+    Templates (e.g., labeling rules) often apply the same
+    patterns to many values so they are only compiled once.
+
+    Args:
+        pattern: The pattern to compile
+        flags: The regex flags to use
+
+    Returns:
+        The compiled pattern
+    """
+    return re.compile(pattern, flags=flags)
+
+
+_MATCHERS: Dict[str, Callable[[Pattern[str], str], Any]] = {
+    "search": re.Pattern.search,
+    "match": re.Pattern.match,
+    "fullmatch": re.Pattern.fullmatch,
+}
+"""The pattern methods usable as `regex` match types"""
+
+
 def regex(
     value: str = "",
     pattern: str = "",
@@ -77,8 +118,8 @@ def regex(
         flags |= re.I
     if multiline:
         flags |= re.M
-    _re = re.compile(pattern, flags=flags)
-    return bool(getattr(_re, match_type, "search")(value))
+    matcher = _MATCHERS.get(match_type, re.Pattern.search)
+    return bool(matcher(_compile(pattern, flags), value))
 
 
 def regex_match(
@@ -131,7 +172,7 @@ def match_any(value: str, regex_list: List[str]) -> bool:
     Returns:
         `True` if at least one pattern matches `False` otherwise
     """
-    return any(re.match(regex, value) for regex in regex_list)
+    return any(_compile(regex).match(value) for regex in regex_list)
 
 
 def elastic_dsl_search(
@@ -223,6 +264,74 @@ def as_datetime(v: str) -> datetime:
     return parse_obj_as(datetime, v)
 
 
+class MemoryBytecodeCache(BytecodeCache):
+    """Jinja2 bytecode cache keeping compiled templates in memory.
+
+    The cache stores the compiled code objects of template files
+    together with the checksum of their source. As long as a template
+    file does not change its compiled code is reused, even across
+    different environments.
+
+    Optionally a second (e.g., file system) cache can be used as fallback
+    for templates that have not been compiled by the current process.
+    """
+
+    def __init__(self, fallback: Optional[BytecodeCache] = None):
+        self._codes: Dict[str, Tuple[str, CodeType]] = {}
+        self.fallback = fallback
+
+    def load_bytecode(self, bucket: Bucket):
+        """Load the cached code for a bucket if its source did not change.
+
+        Args:
+            bucket: The bucket to load the code for
+        """
+        cached = self._codes.get(bucket.key)
+        if cached is not None and cached[0] == bucket.checksum:
+            bucket.code = cached[1]
+        elif self.fallback is not None:
+            self.fallback.load_bytecode(bucket)
+            if bucket.code is not None:
+                self._codes[bucket.key] = (bucket.checksum, bucket.code)
+
+    def dump_bytecode(self, bucket: Bucket):
+        """Store the code of the given bucket.
+
+        Args:
+            bucket: The bucket to store
+        """
+        self._codes[bucket.key] = (bucket.checksum, bucket.code)
+        if self.fallback is not None:
+            self.fallback.dump_bytecode(bucket)
+
+    def clear(self):
+        """Remove all cached template code."""
+        self._codes.clear()
+        if self.fallback is not None:
+            self.fallback.clear()
+
+
+_bytecode_cache = MemoryBytecodeCache()
+"""Bytecode cache shared by all environments created with `create_environment`"""
+
+
+def set_bytecode_cache_dir(directory: Optional[Union[Text, Path]]):
+    """Configure a directory for persisting compiled template files.
+
+    Compiled template files are always cached in memory, with a cache
+    directory they are also reused by later runs (e.g., repeated
+    processing of a dataset) as long as the template files do not change.
+
+    Args:
+        directory: The cache directory or `None` to only cache in memory
+    """
+    if directory is None:
+        _bytecode_cache.fallback = None
+    else:
+        os.makedirs(directory, exist_ok=True)
+        _bytecode_cache.fallback = FileSystemBytecodeCache(str(directory))
+
+
 def create_environment(
     templates_dirs: Optional[Union[Text, Path, List[Union[Text, Path]]]] = None,
     es: Optional[Elasticsearch] = None,
@@ -255,6 +364,8 @@ def create_environment(
         loader=env_loader,
         undefined=StrictUndefined,
         extensions=["jinja2.ext.do", "jinja2.ext.loopcontrols"],
+        # template files only have to be compiled once
+        bytecode_cache=_bytecode_cache,
     )
     custom_tests = {
         "match_any": match_any,
@@ -298,6 +409,155 @@ def create_environment(
     return env
 
 
+_ENVIRONMENT_CACHE_SIZE = 16
+"""The maximum number of environments kept by `get_environment`"""
+
+_environment_cache: "OrderedDict[Tuple[Any, ...], NativeEnvironment]" = OrderedDict()
+"""LRU cache of the environments returned by `get_environment`"""
+
+_environment_lock = threading.Lock()
+"""Lock guarding access to the `_environment_cache`"""
+
+
+def get_environment(
+    templates_dirs: Optional[Union[Text, Path, List[Union[Text, Path]]]] = None,
+    es: Optional[Elasticsearch] = None,
+    dataset_config: Optional[DatasetConfig] = None,
+) -> NativeEnvironment:
+    """Get a shared Jinja2 native environment for rendering dataset templates.
+
+    Works like `create_environment`, but the environment is only
+    created once for each combination of template directories,
+    elasticsearch client and dataset name and is reused afterwards.
+    Only the most recently used environments are kept.
+
+    !!! Note
+        Environments are keyed on the dataset name only, i.e., two dataset
+        configurations with the same name share a single environment.
+
+    Args:
+        templates_dirs: The template directories
+        es: The elasticsearch client object
+        dataset_config: The dataset configuration
+
+    Returns:
+        Jinja2 template environment
+    """
+    dirs_key: Optional[Tuple[str, ...]]
+    if templates_dirs is None:
+        dirs_key = None
+    elif isinstance(templates_dirs, (str, Path)):
+        dirs_key = (str(templates_dirs),)
+    else:
+        dirs_key = tuple(str(d) for d in templates_dirs)
+    key = (
+        dirs_key,
+        es,
+        dataset_config.name if dataset_config is not None else None,
+    )
+
+    # concurrent renders (e.g., write_templates) must share a single environment
+    with _environment_lock:
+        env = _environment_cache.get(key)
+        if env is None:
+            env = create_environment(templates_dirs, es, dataset_config)
+            _environment_cache[key] = env
+            if len(_environment_cache) > _ENVIRONMENT_CACHE_SIZE:
+                # the environments reference the elasticsearch client
+                # so evicting them is required to free old clients
+                _environment_cache.popitem(last=False)
+        else:
+            _environment_cache.move_to_end(key)
+    return env
+
+
+@functools.lru_cache(maxsize=4096)
+def _compile_template_string(source: str) -> CodeType:
+    """Compiles a template string into Python code.
+
+    Filters, tests and globals are resolved from the rendering
+    environment at runtime so the compiled code can be shared
+    by all dataset template environments and template strings
+    only have to be compiled once.
+
+    Args:
+        source: The template string
+
+    Returns:
+        The compiled template code
+    """
+    # filters and tests must exist at compile time so compile with a dataset environment
+    return get_environment().compile(source)
+
+
+_TEMPLATE_STRING_CACHE_SIZE = 2048
+"""The maximum number of template string objects cached for each environment"""
+
+
+def _template_from_string(env: NativeEnvironment, source: str) -> Template:
+    """Get the template object for a template string and environment.
+
+    Equivalent to `env.from_string(source)`, but repeated template
+    strings (e.g., in processor lists or labeling rules) get the
+    same template object instead of a new one for each render.
+
+    !!! Note
+        The template objects are cached on the environment itself so that
+        they are freed together with it (e.g., when it is evicted from
+        the `get_environment` cache).
+
+    Args:
+        env: The Jinja2 environment the template belongs to
+        source: The template string
+
+    Returns:
+        The Jinja2 template
+    """
+    cache = getattr(env, "_template_string_cache", None)
+    if cache is None:
+        cache = LRUCache(_TEMPLATE_STRING_CACHE_SIZE)
+        setattr(env, "_template_string_cache", cache)
+
+    template = cache.get(source)
+    if template is None:
+        template = env.template_class.from_code(
+            env, _compile_template_string(source), env.make_globals(None), None
+        )
+        cache[source] = template
+    return template
+
+
+def is_template_string(value: str) -> bool:
+    """Check if a string contains any Jinja2 template syntax.
+
+    Args:
+        value: The string to check
+
+    Returns:
+        `True` if the string contains a Jinja2 variable, block or
+        comment start marker `False` otherwise.
+    """
+    return "{{" in value or "{%" in value or "{#" in value
+
+
+def render_literal(value: str) -> Any:
+    """Renders a string without any Jinja2 template syntax.
+
+    This produces the same result as rendering the string with the
+    native environment (i.e., newlines are normalized, a single
+    trailing newline is removed and Python literals are converted
+    to their native types), but without compiling a template.
+
+    Args:
+        value: The string to render (must not contain template syntax)
+
+    Returns:
+        The rendered string or native value.
+    """
+    source = "\n".join(value.splitlines())
+    return native_concat([source] if source else [])
+
+
 def render_template(
     template: Union[Text, Path],
     variables: Dict[str, Any],
@@ -316,21 +576,77 @@ def render_template(
         The rendered Jinja2 template
     """
     # get jinja2 environment
-    env = create_environment(es=es, dataset_config=dataset_config)
+    env = get_environment(es=es, dataset_config=dataset_config)
+    return _render_with_env(env, template, variables)
+
+
+def _context_parent(
+    env: NativeEnvironment, variables: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Create the template context parent for the given variables.
+
+    The parent contains the environment globals and the variables. It is
+    not modified while rendering so it can be shared by multiple renders
+    using the same variables.
+
+    Args:
+        env: The Jinja2 environment to use
+        variables: The context variables to use for rendering
+
+    Returns:
+        The template context parent
+    """
+    return dict(env.globals, **variables)
+
+
+def _render_with_env(
+    env: NativeEnvironment,
+    template: Union[Text, Path],
+    variables: Dict[str, Any],
+    parent: Optional[Dict[str, Any]] = None,
+) -> Any:
+    """Renders a dataset Jinja2 template string or file with the given environment.
+
+    Args:
+        env: The Jinja2 environment to use
+        template: The template string or file
+        variables: The context variables to use for rendering
+        parent: The precomputed template context parent for the variables
+                (see `_context_parent`) if it is reused for multiple renders
+
+    Returns:
+        The rendered Jinja2 template
+    """
+    # strings without any template syntax do not need the template engine
+    if not isinstance(template, Path) and not is_template_string(template):
+        return render_literal(template)
 
     # convert strings to template
     if isinstance(template, Path):
         _template = env.get_template(str(template))
     else:
-        _template = env.from_string(template)
+        _template = _template_from_string(env, template)
 
-    value = _template.render(**variables)
+    if parent is None:
+        parent = _context_parent(env, variables)
+
+    # equivalent to _template.render(**variables), but without copying the variables
+    try:
+        value = native_concat(
+            _template.root_render_func(_template.new_context(parent, shared=True))
+        )
+    except Exception:
+        value = env.handle_exception()
 
     if isinstance(value, Undefined):
         value._fail_with_undefined_error()
     return value
 
 
+_RENDERED_TYPES = (dict, list, str)
+"""The types rendered by `render_template_recursive` all others are returned as is"""
+
+
 def render_template_recursive(
     data: Any,
     variables: Dict[str, Any],
@@ -352,30 +668,86 @@ def render_template_recursive(
     Returns:
         The object with all its Jinja2 templates rendered.
     """
+    # all other basic types are returned as is without preparing the environment
+    if not isinstance(data, _RENDERED_TYPES):
+        return data
 
-    # handle sub dicts
-    if isinstance(data, dict):
-        data_rendered = {}
-        for key, val in data.items():
-            # for sub dicts keys we also allow temp
-            key = render_template_recursive(key, variables, es, dataset_config)
-            val = render_template_recursive(val, variables, es, dataset_config)
-            data_rendered[key] = val
-        return data_rendered
-
-    # handle list elements
-    if isinstance(data, list):
-        return [
-            render_template_recursive(val, variables, es, dataset_config)
-            for val in data
-        ]
-
-    # handle str and template strings
+    # all elements are rendered with the same environment
+    env = get_environment(es=es, dataset_config=dataset_config)
     if isinstance(data, str):
-        return render_template(data, variables, es, dataset_config)
+        return _render_with_env(env, data, variables)
+    return _render_recursive(data, variables, env)
+
+
+def _render_recursive(
+    data: Any,
+    variables: Dict[str, Any],
+    env: NativeEnvironment,
+) -> Any:
+    """Renders a complex object containing Jinja2 templates with the given environment.
+
+    The object is traversed using an explicit stack instead of recursive
+    calls. Strings without any template syntax are not passed to
+    the template engine (see `render_literal`).
+
+    Args:
+        data: The object to render
+        variables: The context variables to use for rendering
+        env: The Jinja2 environment to use
 
-    # all other basic types are returned as is
-    return data
+    Returns:
+        The object with all its Jinja2 templates rendered.
+    """
+    # all templates share the same context parent
+    context_parent = _context_parent(env, variables)
+
+    # the root element is rendered into a single element list
+    # so it can be handled just like any other container slot
+    root: List[Any] = [None]
+    # stack of (rendered parent container, key/index, raw element)
+    stack: List[Tuple[Any, Any, Any]] = [(root, 0, data)]
+    while stack:
+        parent, slot, element = stack.pop()
+
+        # handle sub dicts
+        if isinstance(element, dict):
+            data_rendered: Dict[Any, Any] = {}
+            children = []
+            for key, val in element.items():
+                # for sub dicts keys we also allow templates
+                if isinstance(key, str):
+                    key = _render_with_env(env, key, variables, context_parent)
+                if isinstance(val, _RENDERED_TYPES):
+                    # reserve the key position to preserve the dict order
+                    data_rendered[key] = None
+                    children.append((data_rendered, key, val))
+                else:
+                    # all other basic types are used as is
+                    data_rendered[key] = val
+            parent[slot] = data_rendered
+            # reversed so that elements are rendered in their original order
+            stack.extend(reversed(children))
+
+        # handle list elements
+        elif isinstance(element, list):
+            # other basic types are copied as is
+            list_rendered: List[Any] = list(element)
+            parent[slot] = list_rendered
+            stack.extend(
+                (list_rendered, i, val)
+                for i, val in reversed(list(enumerate(element)))
+                if isinstance(val, _RENDERED_TYPES)
+            )
+
+        # handle str and template strings
+        elif isinstance(element, str):
+            parent[slot] = _render_with_env(env, element, variables, context_parent)
+
+        # all other basic types are returned as is
+        else:
+            parent[slot] = element
+
+    return root[0]
 
 
 def write_template(
@@ -410,3 +782,33 @@ def write_template(
     else:
         with open(dest, "w") as dest_file:
             dest_file.write(str(template_rendered))
+
+
+def write_templates(
+    templates: List[Tuple[Path, Path]],
+    variables: Dict[str, Any],
+    es: Optional[Elasticsearch] = None,
+    dataset_config: Optional[DatasetConfig] = None,
+):
+    """Render and write multiple dataset Jinja2 template files.
+
+    All templates are rendered with the same shared environment and
+    variable context. Since each template is written to its own file
+    they are rendered and written concurrently.
+
+    Args:
+        templates: List of template source and destination file pairs
+        variables: The variable context to use for rendering
+        es: The elasticsearch client object
+        dataset_config: The dataset configuration
+    """
+    with ThreadPoolExecutor(max_workers=max(1, len(templates))) as executor:
+        # consume the results to ensure errors are raised
+        list(
+            executor.map(
+                lambda template: write_template(
+                    template[0], template[1], variables, es, dataset_config
+                ),
+                templates,
+            )
+        )
@@ -1,10 +1,13 @@
 """This module contains general purpose utility functions."""
 
+import fnmatch
+import functools
 import importlib.resources as pkg_resources
 import io
-import json
 import os
+import re
 import shutil
+import threading
 
 from pathlib import Path
 from tempfile import NamedTemporaryFile
@@ -13,14 +16,19 @@ from typing import (
     TYPE_CHECKING,
     Any,
     BinaryIO,
+    Callable,
     Dict,
+    Iterator,
     List,
     Optional,
     Sequence,
+    Set,
     Text,
     Union,
 )
 
+import ujson
+
 from pydantic import BaseModel
 from ruamel.yaml import YAML
 
@@ -35,18 +43,53 @@ StreamType = Union[BinaryIO, IO[str], io.StringIO]
 StreamTextType = Union[StreamType, Text]
 
 
+_yaml_local = threading.local()
+"""Thread local storage for the reused YAML (de)serializers"""
+
+
+def _safe_yaml() -> YAML:
+    """Get the safe YAML loader of the current thread.
+
+    YAML instances are not thread safe, but can be reused for
+    multiple loads so each thread only creates one loader.
+
+    Returns:
+        The safe YAML loader
+    """
+    yaml = getattr(_yaml_local, "safe", None)
+    if yaml is None:
+        yaml = _yaml_local.safe = YAML(typ="safe")
+    return yaml
+
+
+def _yaml_writer() -> YAML:
+    """Get the configured YAML writer of the current thread.
+
+    Returns:
+        The round-trip YAML writer
+    """
+    yaml = getattr(_yaml_local, "writer", None)
+    if yaml is None:
+        yaml = _yaml_local.writer = YAML()
+        yaml.indent(mapping=2, sequence=4, offset=2)
+        yaml.default_flow_style = False
+    return yaml
+
+
 def load_yaml_file(file: Union[StreamTextType, Path]) -> Any:
     """Parse and load a YAML file.
 
+    !!! Note
+        The safe loader uses the libyaml based C parser
+        if `ruamel.yaml.clib` is installed.
+
     Args:
         file: The file stream or path to load
 
     Returns:
         The loaded data
     """
-    yaml = YAML(typ="safe")
-
-    return yaml.load(file)
+    return _safe_yaml().load(file)
 
 
 def load_json_file(file: Union[StreamTextType, Path]) -> Any:
@@ -59,9 +102,18 @@ def load_json_file(file: Union[StreamTextType, Path]) -> Any:
         The loaded data
     """
     if isinstance(file, (Text, Path)):
-        with open(file, "r") as f:
-            return json.load(f)
-    return json.load(file)
+        # read the raw bytes in one go, ujson decodes UTF-8 itself
+        with open(file, "rb") as f:
+            return ujson.loads(f.read())
+    return ujson.load(file)
+
+
+_LOADERS: Dict[str, Callable[[Union[StreamTextType, Path]], Any]] = {
+    ".json": load_json_file,
+    ".yaml": load_yaml_file,
+    ".yml": load_yaml_file,
+}
+"""The file loaders for the supported file extensions"""
 
 
 def load_file(file: Union[Text, Path]) -> Any:
@@ -85,14 +137,14 @@ def load_file(file: Union[Text, Path]) -> Any:
         The loaded data
     """
     if isinstance(file, Text):
+        # strings would be parsed as content by the loaders
         file = Path(file)
 
     ext = file.suffix
-    if ext == ".json":
-        return load_json_file(file)
-    elif ext in (".yaml", ".yml"):
-        return load_yaml_file(file)
-    raise NotImplementedError(f"No file loader supported for {ext} files")
+    loader = _LOADERS.get(ext)
+    if loader is None:
+        raise NotImplementedError(f"No file loader supported for {ext} files")
+    return loader(file)
 
 
 def write_yaml_file(data: Any, path: Union[Text, Path]):
@@ -102,12 +154,8 @@ def write_yaml_file(data: Any, path: Union[Text, Path]):
         data: The data to write
         path: The file path to write to
     """
-    yaml = YAML()
-    yaml.indent(mapping=2, sequence=4, offset=2)
-    yaml.default_flow_style = False
-
     with open(path, "w") as f:
-        yaml.dump(data, f)
+        _yaml_writer().dump(data, f)
 
 
 def write_model_to_yaml(model: BaseModel, path: Union[Text, Path]):
@@ -120,7 +168,7 @@ def write_model_to_yaml(model: BaseModel, path: Union[Text, Path]):
     # first serialize to json and reload as simple data
     # and then load serialized data and dump it as yaml
     # we have to do this since model.dict() would not serialize sub-models
-    model_json = json.loads(model.json())
+    model_json = ujson.loads(model.json())
     write_yaml_file(model_json, path)
 
 
@@ -131,11 +179,20 @@ def write_json_file(data: Any, path: Union[Text, Path]):
         data: The data to serialize
         path: The file to write to
     """
-    with open(path, "w") as f:
-        if isinstance(data, BaseModel):
-            f.write(data.json())
-        else:
-            json.dump(data, f)
+    if isinstance(data, BaseModel):
+        payload = data.json()
+    else:
+        payload = ujson.dumps(data, escape_forward_slashes=False)
+    # the serialized data is written in one go instead of in many small chunks
+    with open(path, "wb") as f:
+        f.write(payload.encode("utf-8"))
+
+
+_WRITERS: Dict[str, Callable[[Any, Union[Text, Path]], None]] = {
+    ".yaml": write_yaml_file,
+    ".yml": write_yaml_file,
+}
+"""The config file writers for extensions not written as JSON"""
 
 
 def write_config_file(data: Any, path: Union[Text, Path]):
@@ -148,33 +205,96 @@ def write_config_file(data: Any, path: Union[Text, Path]):
         data: The data to serialize
         path: The file to write to
     """
-    if isinstance(path, Text):
-        path = Path(path)
-
-    ext = path.suffix
-    if ext in (".yaml", ".yml"):
-        write_yaml_file(data, path)
     # unless yaml ext are defined we always write json
-    else:
-        write_json_file(data, path)
+    writer = _WRITERS.get(os.path.splitext(path)[1], write_json_file)
+    writer(data, path)
+
+
+def clone_data(data: Any) -> Any:
+    """Creates a deep copy of plain config data (e.g., loaded from JSON or YAML).
 
+    Only dicts and lists are copied all other values are
+    expected to be immutable and are shared with the original.
+    This is a lot faster than `copy.deepcopy` since it does
+    not have to handle arbitrary Python objects.
 
-def load_variables(sources: Union[Path, Dict[str, Union[Path]]]) -> Any:
+    Args:
+        data: The data to copy
+
+    Returns:
+        The copied data
+    """
+    if isinstance(data, dict):
+        return {key: clone_data(val) for key, val in data.items()}
+    if isinstance(data, list):
+        return [clone_data(val) for val in data]
+    return data
+
+
+@functools.lru_cache(maxsize=128)
+def _load_file_cached(path: Text, mtime_ns: int, size: int) -> Any:
+    """Cached version of `load_file` keyed by the file modification time and size.
+
+    Args:
+        path: The absolute file path to load
+        mtime_ns: The files modification time
+        size: The files size
+
+    Returns:
+        The loaded data
+    """
+    return load_file(path)
+
+
+def load_file_cached(path: Union[Text, Path], shared: bool = False) -> Any:
+    """Loads a JSON or YAML file and caches the parsed data until the file changes.
+
+    Variable and template files are often loaded many times during a
+    pipeline run (e.g., for each item of a foreach processor) so
+    they only have to be parsed again when they are modified.
+
+    Args:
+        path: The file to load
+        shared: If the cached data should be returned instead of a copy.
+                Shared data must not be modified by the caller.
+
+    Returns:
+        The loaded data
+    """
+    stat = os.stat(path)
+    data = _load_file_cached(os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    # the data may be modified by the caller so we must not return the cached object
+    return data if shared else clone_data(data)
+
+
+def clear_file_cache():
+    """Remove all parsed files cached by `load_file_cached`.
+
+    Cached files are reloaded automatically when they are modified,
+    so this is only needed to free the memory of the cached data
+    (e.g., in between processing multiple datasets) or in tests.
+    """
+    _load_file_cached.cache_clear()
+
+
+def load_variables(
+    sources: Union[Path, Dict[str, Union[Path]]],
+    shared: bool = False,
+) -> Any:
     """Loads variables from variable files.
 
     Args:
         sources: The variable file/s to load
+        shared: If the variables may be shared with the file cache.
+                Shared variables must not be modified by the caller.
 
     Returns:
         The loaded variables
     """
     if isinstance(sources, dict):
-        variables = {}
-        for key, path in sources.items():
-            variables[key] = load_file(path)
-        return variables
+        return {key: load_file_cached(path, shared) for key, path in sources.items()}
 
-    return load_file(sources)
+    return load_file_cached(sources, shared)
 
 
 def version_info(cli_info: Info) -> str:
@@ -186,6 +306,19 @@ def version_info(cli_info: Info) -> str:
     Args;
         cli_info: The CLI info object
 
+    Returns:
+        A formated string showing CLI tool information
+    """
+    # the CLI info does not affect the version information
+    return _version_info()
+
+
+@functools.lru_cache(maxsize=1)
+def _version_info() -> str:
+    """Cached implementation of `version_info`.
+
+    The version information does not change while the process runs.
+
     Returns:
         A formated string showing CLI tool information
     """
@@ -208,13 +341,21 @@ def version_info(cli_info: Info) -> str:
 def create_dirs(directories: List[Path], always: bool = False):
     """Creates the given list of directories.
 
+    Directories that already exist are skipped.
+
     Args:
         directories: The directories to create
-        always: If the directories can already exist or not
+        always: Kept for compatibility, existing directories are always skipped
     """
-    for d in directories:
-        if always or not d.exists():
-            os.makedirs(d, exist_ok=always)
+    # the deepest directories are created first so that any directory
+    # that is also a parent of another one is already created along the way
+    created: Set[Path] = set()
+    for d in sorted(set(directories), key=lambda d: len(d.parts), reverse=True):
+        if d in created:
+            continue
+        # makedirs checks for existing directories itself
+        os.makedirs(d, exist_ok=True)
+        created.update(d.parents)
 
 
 def copy_package_file(package: str, file: str, dest: Path, overwrite: bool = False):
@@ -231,6 +372,220 @@ def copy_package_file(package: str, file: str, dest: Path, overwrite: bool = Fal
             shutil.copy(pkg_file, dest.absolute())
 
 
+def _is_glob_pattern(part: str) -> bool:
+    """Checks if a glob path component contains any wildcards.
+
+    Args:
+        part: The glob path component
+
+    Returns:
+        `True` if the component is a wildcard pattern `False` otherwise
+    """
+    return "*" in part or "?" in part or "[" in part
+
+
+@functools.lru_cache(maxsize=None)
+def _compile_glob_part(part: str) -> Callable[[str], Any]:
+    """Compiles a single glob path component into a name matcher.
+
+    Args:
+        part: The glob path component
+
+    Returns:
+        Function returning a truthy value for matching entry names
+    """
+    # file names are case insensitive on windows, just like in pathlib
+    if os.path.normcase("A") == "a":
+        return re.compile(fnmatch.translate(part), re.IGNORECASE).match
+
+    # simple suffix patterns (e.g., *.gz) do not need a regex
+    suffix = part[1:]
+    if part.startswith("*") and not _is_glob_pattern(suffix):
+        return lambda name: name.endswith(suffix)
+
+    return re.compile(fnmatch.translate(part)).match
+
+
+def _iterate_dirs(path: str) -> Iterator[str]:
+    """Iterates over a directory and all its sub directories.
+
+    Symlinked directories are not entered to avoid infinite loops.
+
+    Args:
+        path: The directory to start at
+
+    Returns:
+        Iterator over the directory paths
+    """
+    yield path
+    try:
+        entries = list(os.scandir(path))
+    except PermissionError:
+        return
+    for entry in entries:
+        try:
+            is_dir = entry.is_dir() and not entry.is_symlink()
+        except OSError:
+            is_dir = False
+        if is_dir:
+            yield from _iterate_dirs(entry.path)
+
+
+def _select(path: str, parts: List[str]) -> Iterator[str]:
+    """Selects all paths below a directory matching the glob components.
+
+    Args:
+        path: The directory to select from
+        parts: The remaining glob path components
+
+    Returns:
+        Iterator over the matching paths
+    """
+    part = parts[0]
+    rest = parts[1:]
+
+    # recursive wildcard matching the directory and all its sub directories
+    if part == "**":
+        yielded = set()
+        for directory in _iterate_dirs(path):
+            for match in _select(directory, rest) if rest else [directory]:
+                if match not in yielded:
+                    yielded.add(match)
+                    yield match
+
+    # wildcard component matched against the directory entries
+    elif _is_glob_pattern(part):
+        match_name = _compile_glob_part(part)
+        try:
+            entries = list(os.scandir(path))
+        except PermissionError:
+            return
+        for entry in entries:
+            if not match_name(entry.name):
+                continue
+            if not rest:
+                yield entry.path
+            else:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if is_dir:
+                    yield from _select(entry.path, rest)
+
+    # plain names only have to be checked for existence
+    else:
+        child = os.path.join(path, part)
+        if not rest:
+            if os.path.exists(child):
+                yield child
+        elif os.path.isdir(child):
+            yield from _select(child, rest)
+
+
+def fast_glob(path: Path, pattern: str) -> Iterator[Path]:
+    """Iterate over all paths below a directory matching a glob pattern.
+
+    This is a drop-in replacement for `Path.glob` which works
+    on `os.scandir` entries and plain strings and only creates
+    `Path` objects for the matched paths. This makes it considerably
+    faster for large directory trees.
+
+    Args:
+        path: The directory to search in
+        pattern: The relative glob pattern
+
+    Returns:
+        Iterator over the matching paths
+    """
+    if os.path.isabs(pattern):
+        raise NotImplementedError("Non-relative patterns are unsupported")
+    parts = [
+        part
+        for part in pattern.replace(os.sep, "/").split("/")
+        # empty and current directory components are ignored just like in pathlib
+        if part not in ("", ".")
+    ]
+    if not parts:
+        raise ValueError(f"Unacceptable pattern: {pattern!r}")
+    for match in _select(str(path), parts):
+        yield Path(match)
+
+
+_TRIM_BUFFER_SIZE = 1024 * 1024
+"""The buffer size used for scanning and copying files when trimming them"""
+
+
+def _line_offset(f: BinaryIO, n: int, offset: int = 0) -> int:
+    """Get the byte offset of the line following the `n`th line of a file.
+
+    The file is read in chunks and the newlines are counted by
+    `bytes.count` so that only the last chunk has to be searched
+    for the exact line end.
+
+    Args:
+        f: The binary file to search
+        n: The number of lines to skip
+        offset: The offset (i.e., line start) to start counting lines from
+
+    Returns:
+        The offset after the `n`th line or the file size if
+        the file has less than `n` lines.
+    """
+    f.seek(offset)
+    remaining = n
+    while remaining > 0:
+        chunk = f.read(_TRIM_BUFFER_SIZE)
+        if not chunk:
+            break
+        count = chunk.count(b"\n")
+        if count < remaining:
+            remaining -= count
+            offset += len(chunk)
+            continue
+        pos = -1
+        for _ in range(remaining):
+            pos = chunk.find(b"\n", pos + 1)
+        return offset + pos + 1
+    return offset
+
+
+def _copy_range(src: IO[bytes], dest: IO[bytes], offset: int, count: int):
+    """Copy a byte range of one file to the end of another file.
+
+    Where available `os.sendfile` is used so that the data is copied
+    by the kernel without passing through user space.
+
+    Args:
+        src: The binary file to copy from
+        dest: The binary file to copy to
+        offset: The offset of the first byte to copy
+        count: The number of bytes to copy
+    """
+    if hasattr(os, "sendfile"):
+        dest.flush()
+        try:
+            while count > 0:
+                sent = os.sendfile(dest.fileno(), src.fileno(), offset, count)
+                if sent == 0:
+                    break
+                offset += sent
+                count -= sent
+            return
+        except OSError:
+            # not supported for the given files (e.g., on some file systems)
+            # so we copy the remaining bytes normally
+            os.lseek(dest.fileno(), 0, os.SEEK_END)
+
+    src.seek(offset)
+    while count > 0:
+        chunk = src.read(min(count, _TRIM_BUFFER_SIZE))
+        if not chunk:
+            break
+        dest.write(chunk)
+        count -= len(chunk)
+
+
 def remove_first_lines(path: Union[Text, Path], n: int, inclusive=False):
     """Removes the first lines up until `n`
 
@@ -249,13 +604,13 @@ def remove_first_lines(path: Union[Text, Path], n: int, inclusive=False):
         # nothing to do here
         return
 
-    with open(path, "rb") as original, NamedTemporaryFile("wb", delete=False) as temp:
-        # skip the first n iterations
-        for i in range(n):
-            next(original)
-        # now start the iterator at our new first line
-        for line in original:
-            temp.write(line)
+    # the temporary file is created next to the original so it can be moved by renaming
+    with open(path, "rb") as original, NamedTemporaryFile(
+        "wb", dir=os.path.dirname(os.path.abspath(path)), delete=False
+    ) as temp:
+        # skip the first n lines and copy the rest in bulk
+        start = _line_offset(original, n)
+        _copy_range(original, temp, start, os.fstat(original.fileno()).st_size - start)
     # replace old file with new file
     shutil.move(temp.name, path)
 
@@ -268,11 +623,8 @@ def truncate_file(path: Union[Text, Path], last_line: int):
         last_line: The new last line
     """
     with open(path, "rb+") as f:
-        # read up to the last line
-        for i in range(last_line):
-            f.readline()
-        # and then truncate the file to the current pointer
-        f.truncate()
+        # truncate the file right after the last line
+        f.truncate(_line_offset(f, last_line))
 
 
 def trim_file(
@@ -293,14 +645,31 @@ def trim_file(
     """
     if last_line is not None and start_line is not None and start_line > 1:
         print(f"Trimming file: {path} to be {start_line} - {last_line}")
-    # first truncate the file
-    # so we don't have to adjust for new max line count
-    if last_line is not None:
-        truncate_file(path, last_line)
+    # number of lines to remove before the start line
+    skip = max(0, start_line - 1) if start_line is not None else 0
 
-    # remove all lines before the start line
-    if start_line is not None:
-        remove_first_lines(path, start_line, inclusive=False)
+    # both offsets are located in a single scan of the file
+    with open(path, "rb+") as f:
+        start = _line_offset(f, skip)
+        if last_line is None:
+            end = os.fstat(f.fileno()).st_size
+        elif last_line <= skip:
+            end = start
+        else:
+            end = _line_offset(f, last_line - skip, start)
+
+        if start == 0:
+            # only the end has to be trimmed so we can truncate in place
+            f.truncate(end)
+            return
+
+        # the temporary file is created next to the original so it can be moved by renaming
+        with NamedTemporaryFile(
+            "wb", dir=os.path.dirname(os.path.abspath(path)), delete=False
+        ) as temp:
+            _copy_range(f, temp, start, end - start)
+    # replace old file with new file
+    shutil.move(temp.name, path)
 
 
 def resolve_indices(
@@ -323,13 +692,15 @@ def resolve_indices(
         # use index as is
         return index
 
+    prefix = dataset_name + "-"
+
     if index is None:
         # no index then simply query whole dataset
-        return f"{dataset_name}-*"
+        return prefix + "*"
 
     if isinstance(index, Text):
         # prefix single index
-        return f"{dataset_name}-{index}"
+        return prefix + index
 
     # prefix index list
-    return [f"{dataset_name}-{i}" for i in index]
+    return [prefix + i for i in index]
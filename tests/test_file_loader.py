@@ -9,9 +9,13 @@ from typing import (
 
 import pytest
 
+from cr_kyoushi.dataset.processors import ProcessorContext
+from cr_kyoushi.dataset.templates import render_template
 from cr_kyoushi.dataset.utils import (
+    clear_file_cache,
     load_file,
     load_json_file,
+    load_variables,
     load_yaml_file,
 )
 
@@ -56,3 +60,52 @@ def test_yaml_load_stream(data_expected: Dict[str, Any]):
     with open(f"{FILE_DIR}/test.yaml") as f:
         data = load_yaml_file(f)
         assert data == data_expected
+
+
+def test_load_variables(data_expected: Dict[str, Any]):
+    variables = load_variables(
+        {"yaml": Path(f"{FILE_DIR}/test.yaml"), "json": Path(f"{FILE_DIR}/test.json")}
+    )
+    assert variables == {"yaml": data_expected, "json": data_expected}
+
+    # modifying loaded variables must not affect later loads
+    variables["yaml"]["dict"]["foo"] = "changed"
+    assert load_variables(Path(f"{FILE_DIR}/test.yaml")) == data_expected
+
+
+def test_load_variables_reloads_changed_file(tmp_path: Path):
+    var_file = tmp_path / "vars.json"
+    var_file.write_text('{"foo": "bar"}')
+    assert load_variables(var_file) == {"foo": "bar"}
+
+    var_file.write_text('{"foo": "changed"}')
+    assert load_variables(var_file) == {"foo": "changed"}
+
+
+def test_load_variables_shared(data_expected: Dict[str, Any]):
+    path = Path(f"{FILE_DIR}/test.yaml")
+    shared = load_variables(path, shared=True)
+    assert shared == data_expected
+    # shared loads return the cached data instead of a copy
+    assert load_variables(path, shared=True) is shared
+    assert load_variables(path) is not shared
+
+
+def test_clear_file_cache():
+    path = Path(f"{FILE_DIR}/test.yaml")
+    shared = load_variables(path, shared=True)
+
+    clear_file_cache()
+    # the file is parsed again after the cache was cleared
+    assert load_variables(path, shared=True) is not shared
+
+
+def test_processor_contexts_do_not_share_variable_files(tmp_path: Path):
+    var_file = tmp_path / "vars.yml"
+    var_file.write_text("servers: [a]\n")
+    template = "{% do v.servers.append('x') %}{{ v.servers | length }}"
+
+    # modifications made by a template must not leak into other contexts
+    for _ in range(3):
+        context = ProcessorContext(var_files={"v": var_file})
+        assert render_template(template, context.load()) == 2
@@ -0,0 +1,70 @@
+import os
+
+from pathlib import Path
+
+import pytest
+
+from cr_kyoushi.dataset.utils import fast_glob
+
+
+@pytest.fixture
+def tree(tmp_path: Path) -> Path:
+    for f in [
+        "root.gz",
+        "root.log",
+        "a/logs/one.log.gz",
+        "a/logs/x/two.log.gz",
+        "a/logs/x/y/three.gz",
+        "b/.hidden.gz",
+        "b/logs/four.gz",
+        "b/logs/Upper.GZ",
+        "c/logs.gz/five.gz",
+    ]:
+        path = tmp_path.joinpath(f)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.touch()
+    # symlinked directories must not be recursed into by **
+    os.symlink(tmp_path.joinpath("a"), tmp_path.joinpath("b/link"))
+    os.symlink(tmp_path.joinpath("missing"), tmp_path.joinpath("b/broken.gz"))
+    return tmp_path
+
+
+@pytest.mark.parametrize(
+    "pattern",
+    [
+        pytest.param("*.gz", id="flat"),
+        pytest.param("*", id="all-flat"),
+        pytest.param("**/*.gz", id="recursive"),
+        pytest.param("**", id="recursive-dirs"),
+        pytest.param("**/logs", id="recursive-literal"),
+        pytest.param("*/logs/**/*.gz", id="wildcard-recursive"),
+        pytest.param("a/logs/*.gz", id="literal-prefix"),
+        pytest.param("b/link/logs/*.gz", id="symlink-literal"),
+        pytest.param("*/link/**/*.gz", id="symlink-recursive"),
+        pytest.param("b/*.gz", id="hidden-and-broken"),
+        pytest.param("b/logs/*.gz", id="case-sensitive"),
+        pytest.param("**/*.log.gz", id="multi-suffix"),
+        pytest.param("**/*s.gz/*", id="suffix-dir"),
+        pytest.param("**/*[.]gz", id="suffix-char-class"),
+        pytest.param("*/logs.gz/*", id="dir-matching-suffix"),
+        pytest.param("?/logs/[xy]/*", id="char-classes"),
+        pytest.param("./a//logs/*.gz", id="normalized"),
+        pytest.param("missing/*.gz", id="missing-dir"),
+        pytest.param("root.log", id="literal-file"),
+        pytest.param("root.log/*", id="literal-file-as-dir"),
+    ],
+)
+def test_fast_glob_matches_pathlib(tree: Path, pattern: str):
+    assert sorted(fast_glob(tree, pattern)) == sorted(tree.glob(pattern))
+
+
+@pytest.mark.parametrize(
+    "pattern, error",
+    [
+        pytest.param("", ValueError, id="empty"),
+        pytest.param("/tmp/*.gz", NotImplementedError, id="absolute"),
+    ],
+)
+def test_fast_glob_invalid_pattern(tree: Path, pattern: str, error):
+    with pytest.raises(error):
+        list(fast_glob(tree, pattern))
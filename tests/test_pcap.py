@@ -0,0 +1,64 @@
+import io
+import subprocess
+
+from pathlib import Path
+
+import pytest
+
+from cr_kyoushi.dataset import pcap
+
+
+TSHARK_OUTPUT = (
+    b'{"index":{"_index":"packets-2021-01-01","_type":"doc"}}\n'
+    b'{"layers":{"data":"invalid \xff\xfe utf-8"}}\r\n'
+    b'{"layers":{"data":"split \xc3\xa4 char"}}\n'
+)
+
+
+class FakeTShark:
+    def __init__(self, args, stdout):
+        assert stdout == subprocess.PIPE
+        self.stdout = io.BytesIO(TSHARK_OUTPUT)
+
+    def wait(self):
+        return 0
+
+
+@pytest.fixture
+def fake_tshark(monkeypatch):
+    monkeypatch.setattr(pcap, "get_process_path", lambda: "tshark")
+    monkeypatch.setattr(pcap, "get_tshark_version", lambda path: "3.4.0")
+    monkeypatch.setattr(pcap.subprocess, "Popen", FakeTShark)
+    # copy in tiny blocks to split multi byte characters
+    monkeypatch.setattr(pcap, "_COPY_BUFFER_SIZE", 7)
+
+
+@pytest.mark.parametrize(
+    "remove_index_messages, expected",
+    [
+        pytest.param(
+            False,
+            '{"index":{"_index":"packets-2021-01-01","_type":"doc"}}\n'
+            '{"layers":{"data":"invalid �� utf-8"}}\n'
+            '{"layers":{"data":"split ä char"}}\n',
+            id="copy",
+        ),
+        pytest.param(
+            True,
+            '{"layers":{"data":"invalid �� utf-8"}}\n'
+            '{"layers":{"data":"split ä char"}}\n',
+            id="filter-lines",
+        ),
+    ],
+)
+def test_convert_pcap_to_ecs_replaces_invalid_utf8(
+    tmp_path: Path, fake_tshark, remove_index_messages: bool, expected: str
+):
+    dest = tmp_path / "traffic.json"
+    pcap.convert_pcap_to_ecs(
+        tmp_path / "traffic.pcap",
+        dest,
+        remove_index_messages=remove_index_messages,
+    )
+
+    assert dest.read_text(encoding="utf-8") == expected
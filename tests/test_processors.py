@@ -0,0 +1,142 @@
+from pathlib import Path
+from typing import (
+    ClassVar,
+    List,
+)
+
+import pytest
+
+from pydantic import FilePath
+
+from cr_kyoushi.dataset import processors
+from cr_kyoushi.dataset.processors import (
+    GzipProcessor,
+    ProcessorBase,
+    ProcessorPipeline,
+)
+
+
+class CopyProcessor(ProcessorBase):
+    type_: ClassVar = "test.copy"
+    parallel: ClassVar[bool] = True
+
+    src: FilePath
+    dest: Path
+
+    def input_files(self) -> List[Path]:
+        return [self.src]
+
+    def output_files(self) -> List[Path]:
+        return [self.dest]
+
+    def execute(self, dataset_dir, dataset_config, parser_config, es):
+        self.dest.write_text(self.src.read_text())
+
+
+def _copy(name: str, src: Path, dest: Path):
+    return {"name": name, "type": "test.copy", "src": str(src), "dest": str(dest)}
+
+
+@pytest.mark.parametrize(
+    "dest_exists",
+    [
+        pytest.param(False, id="missing-input"),
+        pytest.param(True, id="stale-input"),
+    ],
+)
+def test_parallel_processors_wait_for_batched_inputs(
+    tmp_path: Path, capsys, dest_exists: bool
+):
+    (tmp_path / "a").write_text("data")
+    if dest_exists:
+        (tmp_path / "b").write_text("stale")
+
+    pipeline = ProcessorPipeline({CopyProcessor.type_: CopyProcessor})
+    pipeline.execute(
+        [
+            _copy("first", tmp_path / "a", tmp_path / "b"),
+            _copy("second", tmp_path / "b", tmp_path / "c"),
+        ],
+        tmp_path,
+        None,  # type: ignore
+        None,  # type: ignore
+        None,  # type: ignore
+    )
+
+    assert (tmp_path / "c").read_text() == "data"
+    assert capsys.readouterr().out.splitlines() == [
+        "Executing - first ...",
+        "Executing - second ...",
+    ]
+
+
+@pytest.mark.parametrize(
+    "second_src, second_dest, expected",
+    [
+        pytest.param("c", "d", [["first", "second"]], id="independent"),
+        pytest.param("a", "d", [["first", "second"]], id="shared-input"),
+        pytest.param("b", "d", [["first"], ["second"]], id="read-after-write"),
+        pytest.param("c", "a", [["first"], ["second"]], id="write-after-read"),
+        pytest.param("c", "b", [["first"], ["second"]], id="write-after-write"),
+    ],
+)
+def test_parallel_processors_batch_only_independent_files(
+    tmp_path: Path,
+    monkeypatch,
+    second_src: str,
+    second_dest: str,
+    expected: List[List[str]],
+):
+    for name in ["a", "b", "c"]:
+        (tmp_path / name).write_text(name)
+
+    batches = []
+
+    def _execute_parallel(self, processors, *args):
+        batches.append([processor.name for processor in processors])
+
+    monkeypatch.setattr(ProcessorPipeline, "_execute_parallel", _execute_parallel)
+
+    pipeline = ProcessorPipeline({CopyProcessor.type_: CopyProcessor})
+    pipeline.execute(
+        [
+            _copy("first", tmp_path / "a", tmp_path / "b"),
+            _copy("second", tmp_path / second_src, tmp_path / second_dest),
+        ],
+        tmp_path,
+        None,  # type: ignore
+        None,  # type: ignore
+        None,  # type: ignore
+    )
+
+    assert batches == expected
+
+
+@pytest.mark.parametrize(
+    "files, expected",
+    [
+        pytest.param(["a.gz"], [True], id="single"),
+        pytest.param(["a.gz", "b.gz"], [False, False], id="multiple"),
+    ],
+)
+def test_gzip_processor_only_decompresses_single_files_in_parallel(
+    tmp_path: Path, monkeypatch, files: List[str], expected: List[bool]
+):
+    calls = []
+
+    def _gunzip(gzip_file: Path, parallel: bool = False) -> Path:
+        calls.append(parallel)
+        return gzip_file
+
+    for name in files:
+        (tmp_path / name).touch()
+    monkeypatch.setattr(processors, "_gunzip", _gunzip)
+
+    GzipProcessor(name="gunzip", type="gzip", path=tmp_path, glob="*.gz").execute(
+        tmp_path,
+        None,  # type: ignore
+        None,  # type: ignore
+        None,  # type: ignore
+    )
+
+    assert calls == expected
@@ -0,0 +1,54 @@
+from itertools import islice
+from pathlib import Path
+
+import pytest
+
+from cr_kyoushi.dataset.sample import (
+    _line_index,
+    _read_lines,
+)
+
+
+@pytest.mark.parametrize(
+    "start, end",
+    [
+        pytest.param(1, 6, id="file-start"),
+        pytest.param(1020, 1030, id="across-index-block"),
+        pytest.param(2048, 2048, id="index-block-start"),
+        pytest.param(2995, 3010, id="file-end"),
+        pytest.param(3100, 3110, id="after-file-end"),
+    ],
+)
+def test_read_lines(tmp_path: Path, start: int, end: int):
+    log = tmp_path.joinpath("test.log")
+    log.write_text("".join(f"line {i} ä\n" for i in range(1, 3001)))
+
+    with open(log, "r") as f:
+        expected = list(islice(f, start - 1, end))
+
+    assert _read_lines(log, start, end) == expected
+
+
+def test_read_lines_indexes_incrementally(tmp_path: Path):
+    log = tmp_path.joinpath("test.log")
+    log.write_text("".join(f"line {i}\n" for i in range(1, 3001)))
+    with open(log, "r") as f:
+        lines = f.readlines()
+    stat = log.stat()
+    index = _line_index(str(log), stat.st_size, stat.st_mtime_ns)
+
+    # lines at the top of the file do not need any scanning
+    assert _read_lines(log, 1, 6) == lines[0:6]
+    assert len(index.offsets) == 1
+
+    # the index is only extended up to the block of the requested lines
+    assert _read_lines(log, 2050, 2060) == lines[2049:2060]
+    assert len(index.offsets) == 3
+    assert not index.complete
+
+    # earlier lines reuse the index and later lines extend it
+    assert _read_lines(log, 1020, 1030) == lines[1019:1030]
+    assert _read_lines(log, 2995, 3010) == lines[2994:3000]
+    assert _read_lines(log, 4100, 4110) == []
+    assert len(index.offsets) == 3
+    assert index.complete
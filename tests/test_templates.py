@@ -0,0 +1,102 @@
+import gc
+import weakref
+
+from typing import Any
+
+import pytest
+
+from elasticsearch import Elasticsearch
+
+from cr_kyoushi.dataset.templates import (
+    _ENVIRONMENT_CACHE_SIZE,
+    _compile_template_string,
+    _environment_cache,
+    _render_with_env,
+    _template_from_string,
+    create_environment,
+    get_environment,
+    is_template_string,
+    render_literal,
+    render_template,
+)
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        pytest.param("", id="empty"),
+        pytest.param("some string", id="str"),
+        pytest.param("some string\n", id="trailing-newline"),
+        pytest.param("a\r\nb\r\n", id="crlf"),
+        pytest.param("10", id="int"),
+        pytest.param("[1, 2]", id="list"),
+        pytest.param("{'foo': 'bar'}", id="dict"),
+        pytest.param("'quoted'", id="quoted"),
+    ],
+)
+def test_render_literal_matches_native_render(value: str):
+    assert not is_template_string(value)
+    # render_template itself uses the literal fast path so compare to the engine
+    expected = create_environment().from_string(value).render()
+
+    for rendered in [render_literal(value), render_template(value, {})]:
+        assert rendered == expected
+        assert type(rendered) is type(expected)
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        pytest.param("{{ foo }}", "bar", id="variable"),
+        pytest.param("{% if true %}bar{% endif %}", "bar", id="block"),
+        pytest.param("{# comment #}bar", "bar", id="comment"),
+        pytest.param("bar", False, id="literal"),
+    ],
+)
+def test_is_template_string(value: str, expected: Any):
+    assert is_template_string(value) is bool(expected)
+    if expected:
+        assert render_template(value, {"foo": "bar"}) == expected
+
+
+def test_render_template_string_reuses_compiled_code():
+    template = "{{ value | as_datetime is not none }} {{ items | length }}"
+    first = {"value": "2021-01-01T00:00:00", "items": [1]}
+    second = {"value": "2021-01-02T00:00:00", "items": [1, 2]}
+
+    # the same compiled template string must render each variable context
+    assert render_template(template, first) == "True 1"
+    compiled = _compile_template_string.cache_info()
+    template_object = _template_from_string(get_environment(), template)
+
+    assert render_template(template, second) == "True 2"
+    # the shared environment reuses the template object without compiling
+    assert _template_from_string(get_environment(), template) is template_object
+    assert _compile_template_string.cache_info().misses == compiled.misses
+
+    # other environments reuse the compiled code
+    assert _render_with_env(create_environment(), template, first) == "True 1"
+    assert _compile_template_string.cache_info().hits == compiled.hits + 1
+    assert _compile_template_string.cache_info().misses == compiled.misses
+
+
+def test_get_environment_cache_is_bounded():
+    es = Elasticsearch()
+    es_ref = weakref.ref(es)
+    env = get_environment(es=es)
+    assert get_environment(es=es) is env
+    assert render_template("{{ 1 + 1 }}", {}, es=es) == 2
+    env_ref = weakref.ref(env)
+    del env
+
+    for i in range(_ENVIRONMENT_CACHE_SIZE + 1):
+        get_environment(f"templates-{i}")
+
+    assert len(_environment_cache) <= _ENVIRONMENT_CACHE_SIZE
+
+    # the least recently used environment has been evicted and
+    # nothing else keeps it and its client alive
+    del es
+    gc.collect()
+    assert env_ref() is None
+    assert es_ref() is None
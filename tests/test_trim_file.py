@@ -0,0 +1,78 @@
+from pathlib import Path
+from typing import Optional
+
+import pytest
+
+from cr_kyoushi.dataset.utils import (
+    remove_first_lines,
+    trim_file,
+    truncate_file,
+)
+
+
+CONTENT = b"line 1\nline 2\nline 3\nline 4\nline 5"
+
+
+@pytest.mark.parametrize(
+    "n, inclusive, expected",
+    [
+        pytest.param(1, False, CONTENT, id="first-line"),
+        pytest.param(1, True, b"line 2\nline 3\nline 4\nline 5", id="first-inclusive"),
+        pytest.param(3, False, b"line 3\nline 4\nline 5", id="middle"),
+        pytest.param(4, True, b"line 5", id="unterminated-last-line"),
+        pytest.param(5, True, b"", id="all-lines"),
+        pytest.param(10, True, b"", id="more-than-all-lines"),
+    ],
+)
+def test_remove_first_lines(tmp_path: Path, n: int, inclusive: bool, expected: bytes):
+    path = tmp_path.joinpath("test.log")
+    path.write_bytes(CONTENT)
+
+    remove_first_lines(path, n, inclusive)
+
+    assert path.read_bytes() == expected
+
+
+@pytest.mark.parametrize(
+    "last_line, expected",
+    [
+        pytest.param(0, b"", id="no-lines"),
+        pytest.param(2, b"line 1\nline 2\n", id="middle"),
+        pytest.param(5, CONTENT, id="unterminated-last-line"),
+        pytest.param(10, CONTENT, id="more-than-all-lines"),
+    ],
+)
+def test_truncate_file(tmp_path: Path, last_line: int, expected: bytes):
+    path = tmp_path.joinpath("test.log")
+    path.write_bytes(CONTENT)
+
+    truncate_file(path, last_line)
+
+    assert path.read_bytes() == expected
+
+
+@pytest.mark.parametrize(
+    "start_line, last_line, expected",
+    [
+        pytest.param(None, None, CONTENT, id="nothing"),
+        pytest.param(1, 3, b"line 1\nline 2\nline 3\n", id="end-only"),
+        pytest.param(3, None, b"line 3\nline 4\nline 5", id="start-only"),
+        pytest.param(2, 4, b"line 2\nline 3\nline 4\n", id="start-and-end"),
+        pytest.param(3, 3, b"line 3\n", id="single-line"),
+        pytest.param(4, 2, b"", id="end-before-start"),
+    ],
+)
+def test_trim_file(
+    tmp_path: Path,
+    start_line: Optional[int],
+    last_line: Optional[int],
+    expected: bytes,
+):
+    path = tmp_path.joinpath("test.log")
+    path.write_bytes(CONTENT)
+
+    trim_file(path, start_line, last_line)
+
+    assert path.read_bytes() == expected
+    # the temporary file must have replaced the original
+    assert list(tmp_path.iterdir()) == [path]